@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# ==========================================
+# 📄 geolocation/admin_areas.py
+# ==========================================
+"""
+Offline reverse geocoding to the administrative hierarchy (county, sub-county,
+ward, location, sub-location). Boundary polygons are loaded from a local
+GeoJSON file into a packed STR R-tree; a lookup walks the tree to the few
+polygons whose bounding box contains the point and runs a vectorized
+point-in-polygon test on those only.
+
+Each GeoJSON feature carries whichever of the LEVELS it describes in its
+properties; when features at several levels contain a point, finer (smaller)
+areas take precedence.
+
+Usage:
+    python admin_areas.py -1.2921,36.8219 -0.0917,34.7680
+"""
+import json
+import logging
+import math
+import os
+import sys
+import threading
+
+import numpy as np
+
+ADMIN_BOUNDARIES_PATH = os.environ.get(
+    "ADMIN_BOUNDARIES_PATH", os.path.join("data", "admin_boundaries.geojson")
+)
+
+LEVELS = ("county", "sub_county", "ward", "location", "sub_location")
+
+# Fan-out of the packed R-tree
+NODE_CAPACITY = 16
+
+logger = logging.getLogger(__name__)
+
+class _Ring:
+    """A closed ring with its edges precomputed for point-in-polygon tests"""
+
+    def __init__(self, points):
+        self.points = points
+        xs, ys = points[:, 0], points[:, 1]
+        xs_next, ys_next = np.roll(xs, -1), np.roll(ys, -1)
+        self.xs, self.ys, self.ys_next = xs, ys, ys_next
+        dy = ys_next - ys
+        # Inverse slope per edge; horizontal edges never cross the ray so their value is unused
+        self.inverse_slope = np.divide(xs_next - xs, dy, out=np.zeros_like(dy), where=dy != 0)
+        self.bbox = (xs.min(), ys.min(), xs.max(), ys.max())
+        self.area = abs(np.dot(xs, ys_next) - np.dot(ys, xs_next)) / 2
+
+    def contains(self, x, y):
+        """Even-odd ray casting against every edge at once"""
+        if not (self.bbox[0] <= x <= self.bbox[2] and self.bbox[1] <= y <= self.bbox[3]):
+            return False
+        crosses = (self.ys > y) != (self.ys_next > y)
+        x_at_y = self.xs + (y - self.ys) * self.inverse_slope
+        return bool(np.count_nonzero(crosses & (x < x_at_y)) & 1)
+
+class _Area:
+    """One feature: its admin fields, bounding box and polygons"""
+
+    def __init__(self, fields, polygons):
+        self.fields = fields
+        # polygons: [(outer _Ring, [hole _Rings])]
+        self.polygons = polygons
+        boxes = [outer.bbox for outer, _ in polygons]
+        self.bbox = (
+            min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes)
+        )
+        self.area = sum(outer.area - sum(hole.area for hole in holes) for outer, holes in polygons)
+
+    def contains(self, x, y):
+        for outer, holes in self.polygons:
+            if outer.contains(x, y) and not any(hole.contains(x, y) for hole in holes):
+                return True
+        return False
+
+def _polygons(geometry):
+    if geometry is None:
+        return []
+    if geometry["type"] == "Polygon":
+        parts = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        parts = geometry["coordinates"]
+    else:
+        return []
+    polygons = []
+    for rings in parts:
+        rings = [_Ring(np.asarray(ring, dtype=np.float64)[:, :2]) for ring in rings if len(ring) >= 3]
+        if rings:
+            polygons.append((rings[0], rings[1:]))
+    return polygons
+
+def _str_pack(boxes, entries):
+    """One level of Sort-Tile-Recursive packing: returns (node_boxes, node_children)"""
+    count = len(entries)
+    leaves = math.ceil(count / NODE_CAPACITY)
+    slices = math.ceil(math.sqrt(leaves))
+    per_slice = slices * NODE_CAPACITY
+    order = sorted(range(count), key=lambda i: boxes[i][0] + boxes[i][2])
+    node_boxes, node_children = [], []
+    for start in range(0, count, per_slice):
+        column = sorted(order[start:start + per_slice], key=lambda i: boxes[i][1] + boxes[i][3])
+        for group_start in range(0, len(column), NODE_CAPACITY):
+            group = column[group_start:group_start + NODE_CAPACITY]
+            node_boxes.append((
+                min(boxes[i][0] for i in group), min(boxes[i][1] for i in group),
+                max(boxes[i][2] for i in group), max(boxes[i][3] for i in group)
+            ))
+            node_children.append([entries[i] for i in group])
+    return node_boxes, node_children
+
+class AdminAreaIndex:
+    """STR R-tree over administrative boundary polygons"""
+
+    def __init__(self, areas):
+        self.areas = areas
+        # A node is (bbox, children, is_leaf); leaf children are indexes into areas
+        boxes = [area.bbox for area in areas]
+        level = [(box, [i], True) for i, box in enumerate(boxes)]
+        while len(level) > 1:
+            node_boxes, children = _str_pack([node[0] for node in level], level)
+            level = list(zip(node_boxes, children, [False] * len(children)))
+        self.root = level[0] if level else None
+
+    @classmethod
+    def from_geojson(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        areas = []
+        for feature in data.get("features", []):
+            properties = {k.lower(): v for k, v in (feature.get("properties") or {}).items()}
+            fields = {level: properties[level] for level in LEVELS if properties.get(level)}
+            polygons = _polygons(feature.get("geometry"))
+            if fields and polygons:
+                areas.append(_Area(fields, polygons))
+        return cls(areas)
+
+    def candidates(self, lng, lat):
+        """Areas whose bounding box contains the point"""
+        if self.root is None:
+            return []
+        found, stack = [], [self.root]
+        while stack:
+            box, children, is_leaf = stack.pop()
+            if not (box[0] <= lng <= box[2] and box[1] <= lat <= box[3]):
+                continue
+            if is_leaf:
+                found.extend(self.areas[i] for i in children)
+            else:
+                stack.extend(children)
+        return found
+
+    def lookup(self, lat, lng):
+        """Admin fields for the point, finest level winning, or {} when outside every area"""
+        matches = [area for area in self.candidates(lng, lat) if area.contains(lng, lat)]
+        fields = {}
+        for area in sorted(matches, key=lambda a: a.area, reverse=True):
+            fields.update(area.fields)
+        return fields
+
+    def lookup_many(self, points):
+        """lookup() for an iterable of (lat, lng); repeated points are resolved once"""
+        resolved = {}
+        results = []
+        for lat, lng in points:
+            key = (lat, lng)
+            if key not in resolved:
+                resolved[key] = self.lookup(lat, lng)
+            results.append(resolved[key])
+        return results
+
+_index = None
+_index_lock = threading.Lock()
+_index_loaded = False
+
+def get_index(path=None):
+    """The shared index for ADMIN_BOUNDARIES_PATH, loaded once; None without a boundary file"""
+    global _index, _index_loaded
+    if path:
+        return AdminAreaIndex.from_geojson(path)
+    with _index_lock:
+        if not _index_loaded:
+            _index_loaded = True
+            if os.path.exists(ADMIN_BOUNDARIES_PATH):
+                _index = AdminAreaIndex.from_geojson(ADMIN_BOUNDARIES_PATH)
+                logger.info("Loaded %d admin areas from %s", len(_index.areas), ADMIN_BOUNDARIES_PATH)
+            else:
+                logger.info("No admin boundaries at %s; offline lookup disabled", ADMIN_BOUNDARIES_PATH)
+    return _index
+
+def resolve_locations(locations):
+    """Fill missing admin fields of location dicts that have coordinates, in one batch
+
+    Accepts the geolocator shape ({"auto": [lat, lng], "manual": {...}}) and
+    flat dicts with latitude/longitude. Updated in place; returns the count filled.
+    """
+    index = get_index()
+    if index is None:
+        return 0
+    pending = []
+    for location in locations:
+        if not isinstance(location, dict):
+            continue
+        point = location.get("auto")
+        if not (point and len(point) == 2) and "latitude" in location and "longitude" in location:
+            point = (location["latitude"], location["longitude"])
+        if point and len(point) == 2:
+            pending.append((location, (float(point[0]), float(point[1]))))
+    filled = 0
+    for (location, _), fields in zip(pending, index.lookup_many(point for _, point in pending)):
+        target = location.setdefault("manual", {}) if "auto" in location else location
+        missing = {level: value for level, value in fields.items() if not target.get(level)}
+        if missing:
+            target.update(missing)
+            filled += 1
+    return filled
+
+def main():
+    index = get_index()
+    if index is None:
+        sys.exit(f"No boundary file at {ADMIN_BOUNDARIES_PATH}; set ADMIN_BOUNDARIES_PATH")
+    for arg in sys.argv[1:]:
+        lat, lng = (float(v) for v in arg.split(","))
+        print(json.dumps({"lat": lat, "lng": lng, **index.lookup(lat, lng)}))
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,65 @@
 import streamlit as st
-from object_detector import detect_weapons
+from object_detector import detect_weapons_deduplicated, detection_cache, near_duplicate_index
 from sentiment_analyzer import analyze_threat_level, analyze_image_context
-from PIL import Image
+from inference_client import InferenceClient, InferenceError
+from report_store import ReportStore
+from image_decode import ImageTooLarge
+from incident_report import build_report, get_alert_color
+import metrics
+from PIL import Image, ImageDraw
+from concurrent.futures import ThreadPoolExecutor
+import io
 import json
 import os
+import uuid
 from datetime import datetime
 
+# When set (host:port or unix:/path), models run in the shared inference service instead of this process
+INFERENCE_SERVER = os.environ.get("INFERENCE_SERVER")
+inference_client = InferenceClient(INFERENCE_SERVER) if INFERENCE_SERVER else None
+
+@st.cache_resource
+def start_metrics_exporters():
+    """Prometheus endpoint (METRICS_PORT) and JSON snapshots (METRICS_SNAPSHOT_PATH), started once per server"""
+    if os.environ.get("METRICS_PORT"):
+        metrics.serve_prometheus(int(os.environ["METRICS_PORT"]))
+    if os.environ.get("METRICS_SNAPSHOT_PATH"):
+        metrics.start_snapshot_writer(
+            os.environ["METRICS_SNAPSHOT_PATH"], float(os.environ.get("METRICS_SNAPSHOT_INTERVAL", "60"))
+        )
+    return True
+
+start_metrics_exporters()
+
+@st.cache_resource
+def get_report_store():
+    """One store (and background writer) shared by every session of this server"""
+    return ReportStore()
+
+@st.cache_resource
+def get_executor():
+    """Worker threads shared by every session; they only compute, the script thread renders"""
+    return ThreadPoolExecutor(max_workers=int(os.environ.get("ANALYSIS_WORKERS", "4")), thread_name_prefix="analysis")
+
+def draw_detections(image_bytes, weapons, max_side=1280):
+    """The uploaded image with detection boxes, downscaled for display"""
+    image = Image.open(io.BytesIO(image_bytes))
+    original_size = image.size
+    image.draft("RGB", (max_side, max_side))
+    image = image.convert("RGB")
+    image.thumbnail((max_side, max_side))
+    scale_x, scale_y = image.width / original_size[0], image.height / original_size[1]
+    draw = ImageDraw.Draw(image)
+    for weapon in weapons:
+        if len(weapon.get("bbox") or []) != 4:
+            continue
+        x0, y0, x1, y1 = weapon["bbox"]
+        box = [x0 * scale_x, y0 * scale_y, x1 * scale_x, y1 * scale_y]
+        color = get_alert_color(weapon["severity"])
+        draw.rectangle(box, outline=color, width=3)
+        draw.text((box[0] + 4, box[1] + 2), f"{weapon['weapon']} {weapon['confidence']:.0%}", fill=color)
+    return image
+
 # Streamlit UI Configuration
 st.set_page_config(page_title="AI Crime Reporter", layout="wide")
 st.title("🛡️ AI Weapon Detection System")
@@ -27,62 +81,67 @@ image_description = st.text_area(
     help="Provide additional context about the image to improve threat detection accuracy"
 )
 
-def get_alert_color(threat_level):
-    """Get color coding for threat level"""
-    return {
-        "SERIOUS-URGENT": "red",
-        "SERIOUS": "orange",
-        "MEDIUM": "yellow",
-        "LOW": "green"
-    }.get(threat_level, "gray")
-
 # Process uploaded image
 if uploaded_file is not None:
     col1, col2 = st.columns(2)
     
     with col1:
         st.image(uploaded_file, caption="Uploaded Image", use_container_width=True)
+    with col2:
+        annotated = st.empty()
     
-    with st.spinner("Analyzing for weapons and threats..."):
-        weapons = detect_weapons(uploaded_file)
-        
-        # Enhanced threat analysis with image description
-        threat_level = analyze_threat_level(weapons, image_description)
-        
-        # Additional context analysis
-        context_threat = analyze_image_context(image_description)
-        
-        # Combine threat levels
-        if threat_level == "SERIOUS-URGENT" or context_threat == "SERIOUS":
-            final_threat_level = "SERIOUS-URGENT"
-        elif threat_level == "SERIOUS" or context_threat == "MEDIUM":
-            final_threat_level = "SERIOUS"
-        elif threat_level == "MEDIUM" or context_threat == "LOW":
-            final_threat_level = "MEDIUM"
+    # Stable across reruns of the same upload, so the image is never linked to its own report
+    report_ids = st.session_state.setdefault("report_ids", {})
+    report_id = report_ids.setdefault(uploaded_file.file_id, uuid.uuid4().hex)
+    duplicate_of = None
+    image_bytes = uploaded_file.getvalue()
+    executor = get_executor()
+
+    # Detection and the description-only context analysis run concurrently
+    if inference_client:
+        detect_future = executor.submit(inference_client.detect, image_bytes, image_description)
+        context_future = None
+    else:
+        # Cached by image content, so editing the description does not rerun detection;
+        # with NEAR_DUPLICATE_MODE=on a near-identical recent frame reuses that frame's detections
+        detect_future = executor.submit(
+            detect_weapons_deduplicated, io.BytesIO(image_bytes), image_description, report_id
+        )
+        context_future = executor.submit(analyze_image_context, image_description)
+
+    with st.spinner("Detecting weapons..."):
+        try:
+            if inference_client:
+                weapons = detect_future.result()
+            else:
+                weapons, duplicate_of = detect_future.result()
+        except ImageTooLarge as exc:
+            st.error(f"Image rejected: {exc}")
+            st.stop()
+        except InferenceError as exc:
+            # The service reports its own failures, oversized images included, as InferenceError
+            st.error(f"Inference service error: {exc}")
+            st.stop()
+
+    # Boxes are shown as soon as detection finishes, while the threat analysis runs
+    if inference_client:
+        analyze_future = executor.submit(inference_client.analyze, weapons, image_description)
+    else:
+        analyze_future = executor.submit(analyze_threat_level, weapons, image_description)
+    annotated.image(draw_detections(image_bytes, weapons), caption="Detections", use_container_width=True)
+
+    with st.spinner("Analyzing threat level..."):
+        if inference_client:
+            threat_level, context_threat = analyze_future.result()
         else:
-            final_threat_level = "LOW"
-        
-        alert_color = get_alert_color(final_threat_level)
+            threat_level = analyze_future.result()
+            context_threat = context_future.result()
         
         # Generate comprehensive report
-        report = {
-            "timestamp": datetime.now().isoformat(),
-            "weapons_detected": weapons,
-            "threat_level": final_threat_level,
-            "object_detection_threat": threat_level,
-            "context_threat": context_threat,
-            "alert_color": alert_color,
-            "image_description": image_description,
-            "analysis_notes": []
-        }
-        
-        # Add analysis notes
-        if weapons:
-            report["analysis_notes"].append(f"Detected {len(weapons)} potential weapon(s)")
-        if image_description:
-            report["analysis_notes"].append("Image description provided for context analysis")
-        if final_threat_level != "LOW":
-            report["analysis_notes"].append(f"Threat level elevated to {final_threat_level}")
+        links = {"duplicate_of": duplicate_of} if duplicate_of else {}
+        report = build_report(weapons, threat_level, context_threat, image_description, report_id=report_id, **links)
+        final_threat_level = report["threat_level"]
+        alert_color = report["alert_color"]
 
     # Display results
     st.subheader("🔍 Enhanced Detection Results")
@@ -131,18 +190,48 @@ if uploaded_file is not None:
         st.metric("Final Threat Level", final_threat_level)
         st.metric("Objects Detected", len(weapons) if weapons else 0)
 
-    # Report download section
+    if inference_client:
+        detect_stats = inference_client.stats()["detect"]
+        st.caption(
+            f"Inference service: queue {detect_stats['queue_depth']}/{detect_stats['max_queue']}, "
+            f"p50 {detect_stats['p50_ms']:.0f} ms, p99 {detect_stats['p99_ms']:.0f} ms"
+        )
+    else:
+        cache_stats = detection_cache.stats()
+        duplicate_stats = near_duplicate_index.stats()
+        st.caption(
+            f"Detection cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits, "
+            f"{cache_stats['misses']} misses, {cache_stats['size']}/{cache_stats['max_entries']} entries; "
+            f"near-duplicate skip rate {duplicate_stats['skip_rate']:.0%}"
+        )
+        if duplicate_of:
+            st.info(f"Near-duplicate of an earlier image; detections reused from report {duplicate_of}")
+
+    # Report download section; serialized once for the download and the store
+    report_json = json.dumps(report, indent=2)
     st.subheader("📄 Comprehensive Incident Report")
     st.download_button(
         label="Download JSON Report",
-        data=json.dumps(report, indent=2),
+        data=report_json,
         file_name=f"enhanced_weapon_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
         mime="application/json"
     )
 
-    # Save to local storage
-    os.makedirs("reports", exist_ok=True)
-    with open(f"reports/{datetime.now().strftime('%Y%m%d_%H%M%S')}.json", "w") as f:
-        json.dump(report, f)
+    # Save to local storage; the background writer keeps disk I/O off the script thread
+    get_report_store().submit(report, payload=report_json)
     
-    st.success("✅ Report saved to local storage")
\ No newline at end of file
+    st.success("✅ Report saved to local storage")
+
+# Optional in-app metrics panel
+with st.sidebar.expander("📈 Pipeline Metrics"):
+    snapshot = metrics.snapshot()
+    for timing in snapshot["timings"]:
+        labels = ", ".join(f"{k}={v}" for k, v in timing["labels"].items())
+        if timing["name"].endswith("_seconds"):
+            st.text(f"{timing['name']} {labels}\n  p50 {timing['p50'] * 1000:.1f} ms, "
+                    f"p99 {timing['p99'] * 1000:.1f} ms, n={timing['count']}")
+        else:
+            st.text(f"{timing['name']} {labels}\n  p50 {timing['p50']:g}, p99 {timing['p99']:g}, n={timing['count']}")
+    for item in snapshot["counters"] + snapshot["gauges"]:
+        labels = ", ".join(f"{k}={v}" for k, v in item["labels"].items())
+        st.text(f"{item['name']} {labels}: {item['value']:g}")
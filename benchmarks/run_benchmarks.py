@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# ==========================================
+# 📄 benchmarks/run_benchmarks.py
+# ==========================================
+"""
+Offline benchmark of the detection and threat pipeline, stage by stage:
+image decode, preprocessing, forward pass and post-processing in
+object_detector, keyword scoring and classifier calls in sentiment_analyzer,
+and report serialization. Models are the random tiny stand-ins from
+tiny_models, so nothing is downloaded.
+
+Results are written as JSON and compared against a stored baseline; the
+script exits with status 1 when a stage got slower than the tolerance allows.
+
+Usage:
+    python benchmarks/run_benchmarks.py                   # compare with benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --update-baseline # record a new baseline
+    python benchmarks/run_benchmarks.py --sizes 640x480 --batch-sizes 1,8 --detectors yolos
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import torch
+from PIL import Image
+
+import tiny_models
+import object_detector
+import sentiment_analyzer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "latest.json")
+
+DESCRIPTIONS = [
+    "",
+    "A person holding a gun and threatening someone near the shop",
+    "A car parked on the street " * 20,
+]
+
+def synthetic_jpeg(width, height, seed=0):
+    """A noisy gradient image encoded as JPEG, roughly as hard to decode as a camera still"""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    pixels = np.clip(gradient + rng.normal(0, 40, (height, width, 3)), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+def measure(fn, repeat):
+    """Run fn once to warm up, then repeat times; returns (median, p90) in milliseconds and the last result"""
+    result = fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[min(len(timings) - 1, int(0.9 * len(timings)))], result
+
+def record(results, name, items, timing):
+    median_ms, p90_ms = timing
+    results[name] = {"median_ms": round(median_ms, 4), "p90_ms": round(p90_ms, 4),
+                     "items": items, "per_item_ms": round(median_ms / items, 4)}
+    print(f"{name:<48} {median_ms:10.3f} ms  ({median_ms / items:.3f} ms/item)")
+
+def bench_detector(results, detector, sizes, batch_sizes, repeat, threshold):
+    tiny_models.install(detector)
+    processor, model = object_detector.get_detector()
+    id2label = model.config.id2label
+    for width, height in sizes:
+        data = synthetic_jpeg(width, height)
+        for batch_size in batch_sizes:
+            tag = f"{detector}/{width}x{height}/b{batch_size}"
+            *timing, images = measure(
+                lambda: [object_detector._load_image(io.BytesIO(data), processor) for _ in range(batch_size)], repeat)
+            record(results, f"detect.decode/{tag}", batch_size, timing)
+            arrays = [image.array for image in images]
+            *timing, inputs = measure(lambda: processor(images=arrays, return_tensors="pt"), repeat)
+            record(results, f"detect.preprocess/{tag}", batch_size, timing)
+
+            def forward():
+                with torch.inference_mode():
+                    return model(**inputs)
+            *timing, outputs = measure(forward, repeat)
+            record(results, f"detect.forward/{tag}", batch_size, timing)
+
+            target_sizes = torch.tensor([image.original_size[::-1] for image in images])
+
+            def postprocess():
+                batch_results = processor.post_process_object_detection(
+                    outputs, target_sizes=target_sizes, threshold=threshold)
+                return [object_detector._classify_detections(r, id2label) for r in batch_results]
+            *timing, _ = measure(postprocess, repeat)
+            record(results, f"detect.postprocess/{tag}", batch_size, timing)
+
+def bench_text(results, batch_sizes, repeat):
+    texts = [sentiment_analyzer._threat_text([], d) for d in DESCRIPTIONS if d]
+    *timing, _ = measure(lambda: [sentiment_analyzer.VIOLENCE_MATCHER.counts(t) for t in texts], repeat)
+    record(results, "text.keywords", len(texts), timing)
+    for batch_size in batch_sizes:
+        batch = (texts * batch_size)[:batch_size]
+        for name in ("sentiment", "violence"):
+            pipe = sentiment_analyzer.model_registry.get(name)
+            *timing, _ = measure(lambda: sentiment_analyzer._classify(pipe, batch, batch_size), repeat)
+            record(results, f"text.{name}/b{batch_size}", batch_size, timing)
+
+def bench_serialization(results, repeat):
+    weapon = {"weapon": "knife", "severity": "SERIOUS-URGENT", "confidence": 0.87,
+              "bbox": [12.5, 40.25, 220.0, 310.75], "original_label": "knife"}
+    report = {
+        "timestamp": datetime.now().isoformat(), "weapons_detected": [weapon] * 50,
+        "threat_level": "SERIOUS-URGENT", "object_detection_threat": "SERIOUS-URGENT",
+        "context_threat": "MEDIUM", "alert_color": "red", "image_description": DESCRIPTIONS[1],
+        "analysis_notes": ["Detected 50 potential weapon(s)"]
+    }
+    *timing, _ = measure(lambda: json.dumps(report, indent=2), repeat)
+    record(results, "report.serialize", 1, timing)
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Stages whose per-item time grew by more than tolerance (and min_delta_ms) over the baseline"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        before, after = previous["per_item_ms"], current["per_item_ms"]
+        if after > before * (1 + tolerance) and after - before > min_delta_ms:
+            regressions.append((name, before, after))
+    return regressions
+
+def parse_sizes(value):
+    return [tuple(int(v) for v in size.split("x")) for size in value.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the detection and threat pipeline")
+    parser.add_argument("--detectors", default="yolos,detr")
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes("320x240,640x480,1280x720"))
+    parser.add_argument("--batch-sizes", type=lambda v: [int(b) for b in v.split(",")], default=[1, 4, 8])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.0,
+                        help="detection threshold; 0 sends every query through post-processing")
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads, fixed for comparability")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative slowdown per stage")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore slowdowns below this")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    results = {}
+    for detector in args.detectors.split(","):
+        bench_detector(results, detector, args.sizes, args.batch_sizes, args.repeat, args.threshold)
+    bench_text(results, args.batch_sizes, args.repeat)
+    bench_serialization(results, args.repeat)
+
+    run = {
+        "created": datetime.now().isoformat(),
+        "machine": {"python": platform.python_version(), "torch": torch.__version__,
+                    "processor": platform.processor() or platform.machine(), "threads": args.threads},
+        "results": results
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against; run with --update-baseline to record one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    for name, before, after in regressions:
+        print(f"REGRESSION {name}: {before:.3f} -> {after:.3f} ms/item")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
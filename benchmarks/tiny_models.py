@@ -0,0 +1,90 @@
+# ==========================================
+# 📄 benchmarks/tiny_models.py
+# ==========================================
+"""
+Randomly initialized tiny YOLOS/DETR detectors and BERT text classifiers.
+They have the same interfaces as the real models but need no downloads, so
+benchmarks and tests run fully offline. install() puts them in the model
+registry in place of the pretrained weights.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+import model_registry
+
+# COCO labels as used by hustvl/yolos-tiny and facebook/detr-resnet-50 (91 ids, some unused)
+COCO_LABELS = [
+    "N/A", "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat",
+    "traffic light", "fire hydrant", "N/A", "stop sign", "parking meter", "bench", "bird", "cat", "dog",
+    "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe", "N/A", "backpack", "umbrella", "N/A",
+    "N/A", "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard", "sports ball", "kite",
+    "baseball bat", "baseball glove", "skateboard", "surfboard", "tennis racket", "bottle", "N/A",
+    "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple", "sandwich", "orange",
+    "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair", "couch", "potted plant", "bed",
+    "N/A", "dining table", "N/A", "N/A", "toilet", "N/A", "tv", "laptop", "mouse", "remote", "keyboard",
+    "cell phone", "microwave", "oven", "toaster", "sink", "refrigerator", "N/A", "book", "clock", "vase",
+    "scissors", "teddy bear", "hair drier", "toothbrush"
+]
+
+TEXT_VOCAB = [
+    "[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "detected", "objects", "severity", "levels", "image",
+    "context", "a", "person", "holding", "gun", "knife", "and", "threatening", "someone", "low", "medium",
+    "serious", "urgent", "-", ":", ",", ".", "the", "street", "car", "parked", "near", "shop"
+]
+
+def _coco_config(config):
+    config.id2label = dict(enumerate(COCO_LABELS))
+    config.label2id = {label: i for i, label in config.id2label.items()}
+    return config
+
+def tiny_yolos():
+    """(processor, model) with the yolos-tiny preprocessing but a 2-layer, 32-wide transformer"""
+    from transformers import YolosConfig, YolosForObjectDetection, YolosImageProcessor
+    config = _coco_config(YolosConfig(
+        hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=64,
+        image_size=[512, 864], patch_size=16, num_detection_tokens=100, num_labels=len(COCO_LABELS)
+    ))
+    processor = YolosImageProcessor(size={"shortest_edge": 512, "longest_edge": 1333})
+    return processor, YolosForObjectDetection(config).eval()
+
+def tiny_detr():
+    """(processor, model) with the DETR preprocessing but a small ResNet and 1-layer transformer"""
+    from transformers import DetrConfig, DetrForObjectDetection, DetrImageProcessor, ResNetConfig
+    backbone = ResNetConfig(embedding_size=8, hidden_sizes=[8, 16, 32, 64], depths=[1, 1, 1, 1],
+                            out_features=["stage4"])
+    config = _coco_config(DetrConfig(
+        use_timm_backbone=False, use_pretrained_backbone=False, backbone=None, backbone_config=backbone,
+        d_model=32, encoder_layers=1, decoder_layers=1, encoder_attention_heads=2, decoder_attention_heads=2,
+        encoder_ffn_dim=64, decoder_ffn_dim=64, num_queries=100, num_labels=len(COCO_LABELS)
+    ))
+    return DetrImageProcessor(), DetrForObjectDetection(config).eval()
+
+def tiny_text_classifier(labels):
+    """A text-classification pipeline over a 2-layer BERT with the given output labels"""
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizer, pipeline
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("\n".join(TEXT_VOCAB))
+        vocab_file = f.name
+    tokenizer = BertTokenizer(vocab_file, model_max_length=512)
+    os.unlink(vocab_file)
+    config = BertConfig(
+        vocab_size=len(TEXT_VOCAB), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=512,
+        id2label=dict(enumerate(labels)), label2id={label: i for i, label in enumerate(labels)}
+    )
+    model = BertForSequenceClassification(config).eval()
+    return pipeline("text-classification", model=model, tokenizer=tokenizer, device=-1)
+
+def install(detector="yolos", seed=0):
+    """Register tiny stand-ins for every model in the registry"""
+    torch.manual_seed(seed)
+    processor, model = tiny_yolos() if detector == "yolos" else tiny_detr()
+    model_registry.override("detector", f"tiny-{detector}", (processor, model))
+    model_registry.override("detector-detr", "tiny-detr", tiny_detr())
+    model_registry.override("sentiment", "tiny-bert-sst2", tiny_text_classifier(["NEGATIVE", "POSITIVE"]))
+    model_registry.override("violence", "tiny-bert-toxic", tiny_text_classifier(["toxic", "non-toxic"]))
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# ==========================================
+# 📄 tools/bulk_scan.py
+# ==========================================
+"""
+Bulk re-scan of image archives with a process pool. Every worker loads the
+detector and classifiers once, then processes shards of images in batches
+through detect_weapons_batch and analyze_threat_level_batch. Reports stream
+to a JSONL file (and optionally the report store) as shards complete, so an
+interrupted scan resumes where it stopped.
+
+Usage:
+    python bulk_scan.py /archive/cam01 --output scan.jsonl
+    python bulk_scan.py "/archive/**/*.jpg" --workers 8 --batch-size 8 --store --resume
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+def find_images(pattern):
+    """Image paths under a directory, or matching a (recursive) glob pattern, sorted"""
+    if os.path.isdir(pattern):
+        paths = (
+            os.path.join(root, name)
+            for root, _, names in os.walk(pattern)
+            for name in names
+        )
+    else:
+        paths = glob.iglob(pattern, recursive=True)
+    return sorted(p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(p))
+
+def already_scanned(output_path):
+    """Sources recorded in an existing output file; a truncated last line is ignored"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["source"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+def _init_worker(threads):
+    """Runs once per worker process: pin torch threads and load every model"""
+    os.environ["INFERENCE_THREADS"] = str(threads)
+    from inference_backends import configure_threads
+    import model_registry
+    configure_threads(threads)
+    model_registry.warmup()
+
+def scan_shard(paths, batch_size):
+    """Reports for one shard of image paths; unreadable images get an error record"""
+    from object_detector import detect_weapons_batch
+    from sentiment_analyzer import analyze_threat_level_batch, analyze_image_context
+    from incident_report import build_report
+
+    records = []
+    for start in range(0, len(paths), batch_size):
+        batch = paths[start:start + batch_size]
+        try:
+            detections = detect_weapons_batch(batch, batch_size=len(batch))
+        except Exception:
+            # Isolate the bad file(s) so one corrupt image does not fail the batch
+            detections = []
+            for path in batch:
+                try:
+                    detections.append(detect_weapons_batch([path], batch_size=1)[0])
+                except Exception as exc:
+                    detections.append(exc)
+        good = [(path, weapons) for path, weapons in zip(batch, detections) if not isinstance(weapons, Exception)]
+        threat_levels = analyze_threat_level_batch([(weapons, "") for _, weapons in good])
+        context_threat = analyze_image_context("")
+        results = {path: (weapons, level) for (path, weapons), level in zip(good, threat_levels)}
+        for path, weapons in zip(batch, detections):
+            if isinstance(weapons, Exception):
+                records.append({"source": path, "error": str(weapons)})
+            else:
+                weapons, threat_level = results[path]
+                records.append(build_report(weapons, threat_level, context_threat, source=path))
+    return records
+
+def _progress(done, total, started, errors):
+    elapsed = time.monotonic() - started
+    rate = done / elapsed if elapsed else 0.0
+    eta = (total - done) / rate if rate else float("inf")
+    eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta != float("inf") else "--:--:--"
+    sys.stderr.write(f"\r{done}/{total} images  {rate:6.1f} img/s  ETA {eta_text}  errors {errors}")
+    sys.stderr.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a directory or glob of images for weapons")
+    parser.add_argument("source", help="directory or glob pattern (quote it; ** is recursive)")
+    parser.add_argument("--output", default="scan_results.jsonl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--shard-size", type=int, default=64, help="images handed to a worker at a time")
+    parser.add_argument("--resume", action="store_true", help="skip images already in --output")
+    parser.add_argument("--store", action="store_true", help="also write reports to the report store")
+    args = parser.parse_args()
+
+    paths = find_images(args.source)
+    if args.resume:
+        done = already_scanned(args.output)
+        paths = [p for p in paths if p not in done]
+    elif os.path.exists(args.output):
+        parser.error(f"{args.output} exists; pass --resume to continue it or choose another --output")
+    if not paths:
+        print("Nothing to scan")
+        return
+
+    store = None
+    if args.store:
+        from report_store import ReportStore
+        store = ReportStore()
+
+    shards = [paths[i:i + args.shard_size] for i in range(0, len(paths), args.shard_size)]
+    # Spawned workers start clean, without inheriting the parent's torch thread pools
+    context = multiprocessing.get_context("spawn")
+    total, done, errors = len(paths), 0, 0
+    started = time.monotonic()
+    with open(args.output, "a") as output, ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=context,
+        initializer=_init_worker, initargs=(args.threads_per_worker,)
+    ) as pool:
+        pending = set()
+        shard_iter = iter(shards)
+        while True:
+            # Keep a bounded number of shards in flight so memory stays flat for huge archives
+            while len(pending) < 2 * args.workers:
+                shard = next(shard_iter, None)
+                if shard is None:
+                    break
+                pending.add(pool.submit(scan_shard, shard, args.batch_size))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                records = future.result()
+                for record in records:
+                    output.write(json.dumps(record) + "\n")
+                output.flush()
+                reports = [r for r in records if "error" not in r]
+                if store and reports:
+                    store.write(reports, [f"scan:{os.path.abspath(r['source'])}" for r in reports])
+                done += len(records)
+                errors += len(records) - len(reports)
+                _progress(done, total, started, errors)
+    sys.stderr.write("\n")
+    if store:
+        store.close()
+    print(f"Scanned {done} images in {time.monotonic() - started:.1f}s, results in {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# ==========================================
+# 📄 services/camera_scheduler.py
+# ==========================================
+"""
+Multi-camera scheduler with a fixed inference budget. Every camera is sampled
+at its own interval: cameras with recent SERIOUS findings run at full rate,
+quiet cameras decay towards a slow sweep. A global token bucket caps the
+inferences per second across all cameras; when more cameras are due than the
+budget allows, the hottest and most overdue ones go first, and due frames are
+detected together in one batch.
+
+A camera is either a drop folder that a camera writes stills into (only the
+newest unseen image is analyzed) or a video file / frame directory replayed
+frame by frame.
+
+Usage:
+    python camera_scheduler.py --camera gate=/feeds/gate --camera lobby=/feeds/lobby.mp4 --budget 4
+    python camera_scheduler.py --replay yard=/archive/yard_frames --budget 2 --store
+"""
+import argparse
+import logging
+import os
+import time
+
+import metrics
+
+SEVERITY_RANK = {"LOW": 0, "MEDIUM": 1, "SERIOUS": 2, "SERIOUS-URGENT": 3}
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """rate tokens per second, holding at most burst"""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, wanted):
+        """Take up to wanted whole tokens; returns how many were taken"""
+        self._refill()
+        taken = min(int(self.tokens), wanted)
+        self.tokens -= taken
+        return taken
+
+    def wait_time(self):
+        """Seconds until the next whole token"""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+class Camera:
+    """A frame source with an adaptive sampling interval
+
+    heat is 1.0 right after a SERIOUS finding and halves every half_life
+    seconds; the interval moves geometrically from max_interval (heat 0) to
+    min_interval (heat 1).
+    """
+
+    def __init__(self, name, source, min_interval=0.5, max_interval=15.0, half_life=60.0,
+                 replay=None, clock=time.monotonic):
+        self.name = name
+        self.source = source
+        # Directories are drop folders unless asked to replay them; files are always replayed
+        self.replay = not os.path.isdir(source) if replay is None else replay
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.half_life = half_life
+        self.clock = clock
+        self.heat = 0.0
+        self.heat_updated = clock()
+        self.next_due = clock()
+        self.frames = 0
+        self.last_threat = "LOW"
+        self._seen_mtime = 0.0
+        self._replay = None
+        self.exhausted = False
+
+    def current_heat(self):
+        now = self.clock()
+        self.heat *= 0.5 ** ((now - self.heat_updated) / self.half_life)
+        self.heat_updated = now
+        return self.heat
+
+    def interval(self):
+        return self.max_interval * (self.min_interval / self.max_interval) ** self.current_heat()
+
+    def priority(self, now):
+        """Hotter and longer-overdue cameras first; overdue time is measured in slow-sweep intervals"""
+        return self.current_heat() + max(0.0, now - self.next_due) / self.max_interval
+
+    def record(self, weapons, threat_level):
+        """Fold one analyzed frame into the heat and schedule the next sample"""
+        rank = SEVERITY_RANK.get(threat_level, 0)
+        heat = self.current_heat()
+        if rank >= SEVERITY_RANK["SERIOUS"]:
+            heat = 1.0
+        elif rank == SEVERITY_RANK["MEDIUM"]:
+            heat = max(heat, 0.5)
+        elif weapons:
+            heat = min(1.0, heat + 0.1)
+        self.heat = heat
+        self.frames += 1
+        self.last_threat = threat_level
+        self.next_due = self.clock() + self.interval()
+
+    def read_frame(self):
+        """Next frame to analyze (a path or RGB array), or None when nothing new is available"""
+        if not self.replay:
+            return self._newest_image()
+        if self._replay is None:
+            from video_stream import iter_frames
+            self._replay = iter_frames(self.source, stride=1)
+        frame = next(self._replay, None)
+        if frame is None:
+            self.exhausted = True
+            return None
+        return frame[1]
+
+    def _newest_image(self):
+        from bulk_scan import IMAGE_EXTENSIONS
+        newest, newest_mtime = None, self._seen_mtime
+        with os.scandir(self.source) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    mtime = entry.stat().st_mtime
+                    if mtime > newest_mtime:
+                        newest, newest_mtime = entry.path, mtime
+        # Older unseen stills are skipped: only the current view matters
+        self._seen_mtime = newest_mtime
+        return newest
+
+class CameraScheduler:
+    """Samples cameras within a global inference budget
+
+    process_batch(frames) returns one (weapons, threat_level) per frame. A frame
+    that fails (e.g. a still the camera is still writing) is counted in
+    camera_frame_errors and its camera is tried again after min_interval.
+    """
+
+    def __init__(self, cameras, budget=4.0, batch_size=8, process_batch=None, on_result=None, clock=time.monotonic):
+        self.cameras = list(cameras)
+        self.bucket = TokenBucket(budget, clock=clock)
+        self.batch_size = batch_size
+        self.process_batch = process_batch or detect_and_analyze
+        self.on_result = on_result
+        self.clock = clock
+        metrics.register_collector(self._gauges)
+
+    def _gauges(self):
+        gauges = []
+        for camera in self.cameras:
+            gauges.append(("camera_interval_seconds", {"camera": camera.name}, camera.interval()))
+            gauges.append(("camera_heat", {"camera": camera.name}, camera.heat))
+        gauges.append(("camera_budget_tokens", {}, self.bucket.tokens))
+        return gauges
+
+    def step(self):
+        """Run one batch of due cameras; returns the number of frames analyzed"""
+        now = self.clock()
+        due = sorted(
+            (c for c in self.cameras if not c.exhausted and c.next_due <= now),
+            key=lambda c: c.priority(now), reverse=True
+        )
+        if not due:
+            return 0
+        granted = self.bucket.take(min(len(due), self.batch_size))
+        if granted < len(due):
+            metrics.incr("camera_budget_deferred", len(due) - granted)
+        batch = []
+        for camera in due[:granted]:
+            try:
+                frame = camera.read_frame()
+            except Exception:
+                logger.exception("%s: could not read a frame", camera.name)
+                self._failed(camera, now)
+                continue
+            if frame is None:
+                # Nothing new yet: look again after a short pause, without spending the token
+                camera.next_due = now + camera.min_interval
+                self.bucket.tokens = min(self.bucket.burst, self.bucket.tokens + 1)
+                continue
+            batch.append((camera, frame))
+        if not batch:
+            return 0
+        with metrics.timer("camera_batch_seconds"):
+            results = self._process([frame for _, frame in batch])
+        for (camera, frame), result in zip(batch, results):
+            if isinstance(result, Exception):
+                logger.error("%s: frame failed: %s", camera.name, result)
+                self._failed(camera, now)
+                continue
+            weapons, threat_level = result
+            camera.record(weapons, threat_level)
+            metrics.incr("camera_frames", camera=camera.name)
+            if self.on_result:
+                self.on_result(camera, frame, weapons, threat_level)
+        return len(batch)
+
+    def _process(self, frames):
+        """process_batch results; when the batch fails, frames are retried one by one and failures hold their exception"""
+        try:
+            return self.process_batch(frames)
+        except Exception as exc:
+            if len(frames) == 1:
+                return [exc]
+            logger.warning("Batch of %d frames failed, retrying frames one by one", len(frames))
+        results = []
+        for frame in frames:
+            try:
+                results.append(self.process_batch([frame])[0])
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    def _failed(self, camera, now):
+        # A drop-folder still that was only partly written gets a newer mtime once complete
+        metrics.incr("camera_frame_errors", camera=camera.name)
+        camera.next_due = now + camera.min_interval
+
+    def next_wakeup(self):
+        """Seconds until a camera is due and a token is available"""
+        live = [c.next_due for c in self.cameras if not c.exhausted]
+        if not live:
+            return None
+        return max(0.0, min(live) - self.clock(), self.bucket.wait_time())
+
+    def run(self, duration=None):
+        """Schedule until every camera is exhausted or duration seconds have passed"""
+        stop_at = None if duration is None else self.clock() + duration
+        while stop_at is None or self.clock() < stop_at:
+            if self.step():
+                continue
+            wait = self.next_wakeup()
+            if wait is None:
+                break
+            time.sleep(min(max(wait, 0.01), 1.0))
+
+def detect_and_analyze(frames):
+    """Default process_batch: batched detection and threat analysis"""
+    from object_detector import detect_weapons_batch
+    from sentiment_analyzer import analyze_threat_level_batch
+    detections = detect_weapons_batch(frames, batch_size=len(frames))
+    return list(zip(detections, analyze_threat_level_batch([(weapons, "") for weapons in detections])))
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample several cameras within a fixed inference budget")
+    parser.add_argument("--camera", action="append", default=[], metavar="NAME=PATH",
+                        help="drop folder of stills (or a video file to replay)")
+    parser.add_argument("--replay", action="append", default=[], metavar="NAME=PATH",
+                        help="video file or frame directory replayed frame by frame")
+    parser.add_argument("--budget", type=float, default=4.0, help="inferences per second across all cameras")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--min-interval", type=float, default=0.5, help="seconds between samples of a hot camera")
+    parser.add_argument("--max-interval", type=float, default=15.0, help="seconds between samples of a quiet camera")
+    parser.add_argument("--half-life", type=float, default=60.0, help="seconds for a camera to cool down by half")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--store", action="store_true", help="write a report for every non-LOW frame")
+    args = parser.parse_args()
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+
+    cameras = []
+    for spec, replay in [(spec, None) for spec in args.camera] + [(spec, True) for spec in args.replay]:
+        name, _, path = spec.partition("=")
+        cameras.append(Camera(name, path, args.min_interval, args.max_interval, args.half_life, replay))
+    if not cameras:
+        parser.error("add at least one --camera or --replay")
+
+    store = None
+    if args.store:
+        from report_store import ReportStore
+        store = ReportStore()
+
+    def on_result(camera, frame, weapons, threat_level):
+        if threat_level == "LOW":
+            return
+        logger.info("%s: %s threat, %d detection(s)", camera.name, threat_level, len(weapons))
+        if store:
+            from incident_report import build_report
+            source = frame if isinstance(frame, str) else f"{camera.source}#{camera.frames}"
+            store.submit(build_report(weapons, threat_level, "", camera=camera.name, source=source))
+
+    scheduler = CameraScheduler(cameras, args.budget, args.batch_size, on_result=on_result)
+    try:
+        scheduler.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for camera in cameras:
+            logger.info("%s: %d frames, last threat %s", camera.name, camera.frames, camera.last_threat)
+        if store:
+            store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# ==========================================
+# 📄 detectors/detection_cache.py
+# ==========================================
+"""
+Content-addressed cache of detection results. Entries are keyed by a hash of
+the image bytes plus the model id and threshold, kept in a bounded in-memory
+LRU and optionally mirrored to a directory of JSON files.
+"""
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+class DetectionCache:
+    """In-memory LRU of detections with an optional on-disk tier"""
+
+    def __init__(self, max_entries=256, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(image_bytes, model_id, threshold):
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return f"{digest}-{model_id}-{threshold}".replace("/", "_")
+
+    def get(self, key):
+        """Cached detections for key, or None on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(self._entries[key])
+        detected = self._read_disk(key)
+        with self._lock:
+            if detected is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, detected)
+        return copy.deepcopy(detected)
+
+    def put(self, key, detected):
+        detected = copy.deepcopy(detected)
+        with self._lock:
+            self._remember(key, detected)
+        self._write_disk(key, detected)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "max_entries": self.max_entries
+        }
+
+    def _remember(self, key, detected):
+        self._entries[key] = detected
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, detected):
+        if not self.cache_dir:
+            return
+        # Write to a temporary file first so readers never see a partial entry
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(detected, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            pass
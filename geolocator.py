@@ -1,25 +1,48 @@
 # ==========================================
 # 📄 geolocation/geolocator.py
 # ==========================================
+import os
+
 import geocoder
 import streamlit as st
 
-def get_location():
+from admin_areas import LEVELS, get_index
+
+# Seconds an IP-based location is reused across reruns
+IP_LOOKUP_TTL = int(os.environ.get("IP_LOOKUP_TTL", 600))
+
+LEVEL_LABELS = {
+    "county": "County",
+    "sub_county": "Sub-county",
+    "ward": "Ward",
+    "location": "Location",
+    "sub_location": "Sub-location"
+}
+
+@st.cache_data(ttl=IP_LOOKUP_TTL, show_spinner=False)
+def ip_location():
+    """[lat, lng] for this machine's public IP, or None"""
     g = geocoder.ip('me')
-    auto = g.latlng if g.ok else None
+    return g.latlng if g.ok else None
+
+@st.cache_resource
+def admin_index():
+    return get_index()
+
+def get_location():
+    auto = ip_location()
 
     st.subheader("📍 Location Info")
+    resolved = {}
     if auto:
         st.success(f"Auto location: {auto}")
+        index = admin_index()
+        if index is not None:
+            resolved = index.lookup(*auto)
     else:
         st.warning("Couldn't fetch location automatically. Please enter manually.")
 
-    manual = {
-        "county": st.text_input("County"),
-        "sub_county": st.text_input("Sub-county"),
-        "ward": st.text_input("Ward"),
-        "location": st.text_input("Location"),
-        "sub_location": st.text_input("Sub-location")
-    }
+    # Offline lookup pre-fills the hierarchy; the user can still correct it
+    manual = {level: st.text_input(LEVEL_LABELS[level], value=resolved.get(level, "")) for level in LEVELS}
 
-    return {"auto": auto, "manual": manual}
\ No newline at end of file
+    return {"auto": auto, "manual": manual}
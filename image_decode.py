@@ -0,0 +1,118 @@
+# ==========================================
+# 📄 detectors/image_decode.py
+# ==========================================
+"""
+Memory-bounded image decoding. Uploads are checked against byte and pixel
+limits before any pixel data is decoded, JPEGs are decoded in draft mode at
+the smallest DCT scale that still covers the model's input size, and other
+formats are reduced right after loading. The result is a contiguous RGB
+NumPy array plus the original size, so detections can be reported in
+original image coordinates.
+"""
+import io
+import math
+import os
+
+import numpy as np
+from PIL import Image
+
+MAX_IMAGE_BYTES = int(os.environ.get("MAX_IMAGE_BYTES", 30 * 1024 * 1024))
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", 50_000_000))
+
+class ImageTooLarge(ValueError):
+    """Raised when an image exceeds the byte or pixel limits"""
+
+class DecodedImage:
+    """RGB pixels decoded at (or above) the model resolution, with the original size"""
+
+    def __init__(self, array, original_size):
+        self.array = array
+        self.original_size = original_size  # (width, height) of the source image
+
+    @property
+    def size(self):
+        return self.array.shape[1], self.array.shape[0]
+
+    @property
+    def scale(self):
+        """(x, y) factors from decoded pixels to original pixels"""
+        return self.original_size[0] / self.size[0], self.original_size[1] / self.size[1]
+
+def decode_image(image_file, shortest_edge=None, longest_edge=None,
+                 max_bytes=MAX_IMAGE_BYTES, max_pixels=MAX_IMAGE_PIXELS, edges=None):
+    """Decode a path, file-like object, bytes, PIL image or array close to the requested size
+
+    shortest_edge/longest_edge follow the HF processor convention: the image is
+    resized so its shortest edge reaches shortest_edge unless that pushes the
+    longest edge past longest_edge. Decoding never goes below that size.
+    edges(original_size), if given, picks them once the header has been read.
+    """
+    if isinstance(image_file, np.ndarray):
+        # Already decoded (e.g. a video frame): only reduce when it is well above the model size
+        original_size = (image_file.shape[1], image_file.shape[0])
+        if edges:
+            shortest_edge, longest_edge = edges(original_size)
+        ratio = _resize_ratio(original_size, shortest_edge, longest_edge)
+        factor = int(1 / ratio) if ratio < 1 else 1
+        if factor >= 2:
+            return DecodedImage(np.asarray(Image.fromarray(image_file[..., :3]).reduce(factor)), original_size)
+        return DecodedImage(np.ascontiguousarray(image_file[..., :3]), original_size)
+    if isinstance(image_file, (bytes, bytearray)):
+        image_file = io.BytesIO(image_file)
+    if not isinstance(image_file, Image.Image):
+        _check_bytes(image_file, max_bytes)
+        image = Image.open(image_file)  # reads the header only
+    else:
+        image = image_file
+    original_size = image.size
+    if original_size[0] * original_size[1] > max_pixels:
+        raise ImageTooLarge(f"image has {original_size[0]}x{original_size[1]} pixels, limit is {max_pixels}")
+    if edges:
+        shortest_edge, longest_edge = edges(original_size)
+
+    ratio = _resize_ratio(original_size, shortest_edge, longest_edge)
+    if ratio < 1:
+        requested = (math.ceil(original_size[0] * ratio), math.ceil(original_size[1] * ratio))
+        if image.format == "JPEG" and not isinstance(image_file, Image.Image):
+            # Decode at 1/2, 1/4 or 1/8 scale directly in the JPEG decoder
+            image.draft("RGB", requested)
+        factor = min(image.size[0] // requested[0], image.size[1] // requested[1])
+        if factor >= 2:
+            if image.mode not in ("RGB", "RGBA", "L", "LA"):
+                image = image.convert("RGB")
+            image = image.reduce(factor)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return DecodedImage(np.asarray(image), original_size)
+
+def _resize_ratio(size, shortest_edge, longest_edge):
+    width, height = size
+    ratios = []
+    if shortest_edge:
+        ratios.append(shortest_edge / min(width, height))
+    if longest_edge:
+        ratios.append(longest_edge / max(width, height))
+    return min(ratios) if ratios else 1.0
+
+def _check_bytes(image_file, max_bytes):
+    if isinstance(image_file, (str, os.PathLike)):
+        size = os.path.getsize(image_file)
+    elif hasattr(image_file, "getbuffer"):
+        size = image_file.getbuffer().nbytes
+    elif hasattr(image_file, "seek"):
+        position = image_file.tell()
+        size = image_file.seek(0, io.SEEK_END) - position
+        image_file.seek(position)
+    else:
+        return
+    if size > max_bytes:
+        raise ImageTooLarge(f"image is {size} bytes, limit is {max_bytes}")
+
+def processor_edges(processor):
+    """(shortest_edge, longest_edge) the processor resizes to, or (None, None)"""
+    size = getattr(processor, "size", None) or {}
+    if "shortest_edge" in size:
+        return size["shortest_edge"], size.get("longest_edge")
+    if "height" in size and "width" in size:
+        return min(size["height"], size["width"]), max(size["height"], size["width"])
+    return None, None
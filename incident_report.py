@@ -0,0 +1,54 @@
+# ==========================================
+# 📄 reports/incident_report.py
+# ==========================================
+"""
+Threat level combination and incident report layout, shared by the
+Streamlit app and the batch tools.
+"""
+import uuid
+from datetime import datetime
+
+def get_alert_color(threat_level):
+    """Get color coding for threat level"""
+    return {
+        "SERIOUS-URGENT": "red",
+        "SERIOUS": "orange",
+        "MEDIUM": "yellow",
+        "LOW": "green"
+    }.get(threat_level, "gray")
+
+def combine_threat_levels(threat_level, context_threat):
+    """Final threat level from the object detection and context analyses"""
+    if threat_level == "SERIOUS-URGENT" or context_threat == "SERIOUS":
+        return "SERIOUS-URGENT"
+    elif threat_level == "SERIOUS" or context_threat == "MEDIUM":
+        return "SERIOUS"
+    elif threat_level == "MEDIUM" or context_threat == "LOW":
+        return "MEDIUM"
+    else:
+        return "LOW"
+
+def build_report(weapons, threat_level, context_threat, image_description="", **extra):
+    """Generate comprehensive report; extra keys (report_id, source, location, ...) are added as-is"""
+    final_threat_level = combine_threat_levels(threat_level, context_threat)
+    report = {
+        "report_id": uuid.uuid4().hex,
+        "timestamp": datetime.now().isoformat(),
+        "weapons_detected": weapons,
+        "threat_level": final_threat_level,
+        "object_detection_threat": threat_level,
+        "context_threat": context_threat,
+        "alert_color": get_alert_color(final_threat_level),
+        "image_description": image_description,
+        "analysis_notes": []
+    }
+
+    # Add analysis notes
+    if weapons:
+        report["analysis_notes"].append(f"Detected {len(weapons)} potential weapon(s)")
+    if image_description:
+        report["analysis_notes"].append("Image description provided for context analysis")
+    if final_threat_level != "LOW":
+        report["analysis_notes"].append(f"Threat level elevated to {final_threat_level}")
+    report.update(extra)
+    return report
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# ==========================================
+# 📄 models/inference_backends.py
+# ==========================================
+"""
+CPU inference backends for the detector and the text classifiers.
+
+Selected through the environment:
+    DETECTOR_BACKEND   eager (default) | int8 | torchscript | onnx
+    TEXT_BACKEND       eager (default) | int8
+    INFERENCE_THREADS  intra-op thread count for torch / onnxruntime
+    ONNX_CACHE_DIR     where exported ONNX graphs are kept (default .onnx_cache)
+    ONNX_CACHE_FILES   how many exported graphs are kept there (default 32)
+    SHAPE_BUCKET       traced inputs are padded to a multiple of this many pixels (default 64)
+
+A detector backend that cannot be built falls back to eager with a warning;
+backend_of() tells which one a model actually uses.
+
+TorchScript and ONNX graphs are traced per input shape, since the detectors
+resize positional embeddings to the image size. Inputs are zero-padded up to
+the next SHAPE_BUCKET multiple (and the batch to a power of two), so mixed
+image sizes share a small set of graphs; fixed-resolution cameras hit one.
+
+Usage:
+    python inference_backends.py verify --backend int8 image1.jpg image2.jpg
+"""
+import argparse
+import copy
+import logging
+import os
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+DETECTOR_BACKENDS = ("eager", "int8", "torchscript", "onnx")
+TEXT_BACKENDS = ("eager", "int8")
+
+_threads_configured = False
+
+def detector_backend():
+    return os.environ.get("DETECTOR_BACKEND", "eager").lower()
+
+def text_backend():
+    return os.environ.get("TEXT_BACKEND", "eager").lower()
+
+def configure_threads(num_threads=None):
+    """Apply INFERENCE_THREADS (or num_threads) to torch once per process"""
+    global _threads_configured
+    num_threads = num_threads or int(os.environ.get("INFERENCE_THREADS", "0") or 0)
+    if _threads_configured or not num_threads:
+        return
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # only allowed before the first parallel region
+    _threads_configured = True
+
+def optimize_detector(model, backend=None):
+    """Wrap or convert an eval-mode HF detection model for the selected backend"""
+    backend = backend or detector_backend()
+    configure_threads()
+    try:
+        if backend == "eager":
+            optimized = model
+        elif backend == "int8":
+            optimized = quantize_int8(model)
+        elif backend == "torchscript":
+            optimized = TracedDetector(model)
+        elif backend == "onnx":
+            optimized = OnnxDetector(model)
+        else:
+            raise ValueError(f"unknown detector backend {backend!r}, expected one of {DETECTOR_BACKENDS}")
+    except Exception as exc:
+        logger.warning("Detector backend %s unavailable, using eager: %s", backend, exc)
+        optimized, backend = model, "eager"
+    optimized.inference_backend = backend
+    return optimized
+
+def backend_of(model):
+    """The backend a detector from optimize_detector actually uses"""
+    return getattr(model, "inference_backend", "eager")
+
+def optimize_pipeline(pipe, backend=None):
+    """Apply the selected backend to a transformers text-classification pipeline"""
+    backend = backend or text_backend()
+    configure_threads()
+    if backend == "int8":
+        pipe.model = quantize_int8(pipe.model)
+    elif backend != "eager":
+        logger.warning("Text backend %s is not supported, using eager", backend)
+    return pipe
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of every Linear layer"""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+class _TupleOutputs(torch.nn.Module):
+    """Exposes logits and pred_boxes as a plain tuple so the model can be traced"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values, pixel_mask=None):
+        if pixel_mask is None:
+            outputs = self.model(pixel_values=pixel_values)
+        else:
+            outputs = self.model(pixel_values=pixel_values, pixel_mask=pixel_mask)
+        return outputs.logits, outputs.pred_boxes
+
+def _pad_to(tensor, batch, height, width):
+    """Zero-pad a (batch, [channels,] height, width) tensor at the end of each dimension"""
+    padding = [0, width - tensor.shape[-1], 0, height - tensor.shape[-2]]
+    padding += [0, 0] * (tensor.dim() - 3) + [0, batch - tensor.shape[0]]
+    return torch.nn.functional.pad(tensor, padding)
+
+class _ShapeCachedDetector:
+    """Base for backends that compile one graph per (bucketed) input shape"""
+
+    def __init__(self, model, max_graphs=8, bucket=None):
+        self.config = model.config
+        self.max_graphs = max_graphs
+        self.bucket = bucket or int(os.environ.get("SHAPE_BUCKET", "64"))
+        self._model = _TupleOutputs(model).eval()
+        self._graphs = OrderedDict()
+
+    def eval(self):
+        return self
+
+    def __call__(self, pixel_values, pixel_mask=None, **kwargs):
+        batch, _, height, width = pixel_values.shape
+        padded = (
+            1 << (batch - 1).bit_length(),
+            -(-height // self.bucket) * self.bucket,
+            -(-width // self.bucket) * self.bucket,
+        )
+        inputs = (_pad_to(pixel_values, *padded),)
+        if pixel_mask is not None:
+            inputs += (_pad_to(pixel_mask, *padded),)
+        key = tuple(tuple(t.shape) for t in inputs)
+        graph = self._graphs.get(key)
+        if graph is None:
+            graph = self._compile(inputs)
+            self._graphs[key] = graph
+            while len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+        self._graphs.move_to_end(key)
+        logits, pred_boxes = self._run(graph, inputs)
+        logits, pred_boxes = logits[:batch], pred_boxes[:batch]
+        if pixel_mask is None:
+            # Without a mask the boxes are relative to the padded frame; map them back
+            sx, sy = padded[2] / width, padded[1] / height
+            pred_boxes = pred_boxes * pred_boxes.new_tensor([sx, sy, sx, sy])
+        return SimpleNamespace(logits=logits, pred_boxes=pred_boxes)
+
+class TracedDetector(_ShapeCachedDetector):
+    """TorchScript backend: traced and frozen per input shape"""
+
+    def _compile(self, inputs):
+        with torch.inference_mode():
+            traced = torch.jit.trace(self._model, inputs, check_trace=False, strict=False)
+        return torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+
+    def _run(self, graph, inputs):
+        with torch.inference_mode():
+            return graph(*inputs)
+
+class OnnxDetector(_ShapeCachedDetector):
+    """ONNX Runtime backend: exported once per input shape into ONNX_CACHE_DIR"""
+
+    def __init__(self, model, max_graphs=8, cache_dir=None, max_files=None, bucket=None):
+        import onnxruntime  # optional dependency, only needed for this backend
+        self._ort = onnxruntime
+        super().__init__(model, max_graphs, bucket)
+        self.cache_dir = cache_dir or os.environ.get("ONNX_CACHE_DIR", ".onnx_cache")
+        self.max_files = max_files or int(os.environ.get("ONNX_CACHE_FILES", "32"))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _compile(self, inputs):
+        names = ["pixel_values", "pixel_mask"][:len(inputs)]
+        shape = "-".join("x".join(map(str, t.shape)) for t in inputs)
+        path = os.path.join(self.cache_dir, f"{self.config.model_type}-{shape}.onnx")
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            with torch.inference_mode():
+                torch.onnx.export(self._model, inputs, path, input_names=names,
+                                  output_names=["logits", "pred_boxes"], opset_version=17, dynamo=False)
+            self._evict_files(keep=path)
+        options = self._ort.SessionOptions()
+        threads = int(os.environ.get("INFERENCE_THREADS", "0") or 0)
+        if threads:
+            options.intra_op_num_threads = threads
+        session = self._ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        return session, names
+
+    def _evict_files(self, keep):
+        """Remove the least recently used exported graphs beyond max_files"""
+        paths = sorted(
+            (os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".onnx")),
+            key=os.path.getmtime
+        )
+        for path in paths[:max(0, len(paths) - self.max_files)]:
+            if path != keep:
+                os.remove(path)
+
+    def _run(self, graph, inputs):
+        session, names = graph
+        feeds = {name: tensor.numpy() for name, tensor in zip(names, inputs)}
+        logits, pred_boxes = session.run(["logits", "pred_boxes"], feeds)
+        return torch.from_numpy(logits), torch.from_numpy(pred_boxes)
+
+def verify_detector(processor, reference, candidate, images, threshold=0.3,
+                    score_tolerance=0.05, iou_threshold=0.9):
+    """Check that candidate reproduces the reference detections within tolerance
+
+    Every reference detection needs a candidate detection with the same label,
+    IoU >= iou_threshold and a score within score_tolerance.
+    """
+    from torchvision.ops import box_iou
+
+    report = {"images": 0, "reference_detections": 0, "matched": 0, "max_score_diff": 0.0,
+              "reference_seconds": 0.0, "candidate_seconds": 0.0}
+    for image in images:
+        inputs = processor(images=[image], return_tensors="pt")
+        target_sizes = torch.tensor([image.size[::-1]])
+        results = []
+        for name, model in (("reference", reference), ("candidate", candidate)):
+            start = time.perf_counter()
+            with torch.inference_mode():
+                outputs = model(**inputs)
+            report[f"{name}_seconds"] += time.perf_counter() - start
+            results.append(processor.post_process_object_detection(
+                outputs, target_sizes=target_sizes, threshold=threshold)[0])
+        expected, actual = results
+        report["images"] += 1
+        report["reference_detections"] += len(expected["scores"])
+        if len(expected["scores"]) == 0 or len(actual["scores"]) == 0:
+            continue
+        ious = box_iou(expected["boxes"], actual["boxes"])
+        same_label = expected["labels"][:, None] == actual["labels"][None, :]
+        score_diff = (expected["scores"][:, None] - actual["scores"][None, :]).abs()
+        candidates = same_label & (ious >= iou_threshold)
+        best_diff = torch.where(candidates, score_diff, torch.full_like(score_diff, float("inf"))).min(dim=1).values
+        matched = best_diff <= score_tolerance
+        report["matched"] += int(matched.sum())
+        if matched.any():
+            report["max_score_diff"] = max(report["max_score_diff"], float(best_diff[matched].max()))
+    report["ok"] = report["matched"] == report["reference_detections"]
+    if report["candidate_seconds"]:
+        report["speedup"] = report["reference_seconds"] / report["candidate_seconds"]
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a detector backend against eager fp32")
+    commands = parser.add_subparsers(dest="command", required=True)
+    verify = commands.add_parser("verify")
+    verify.add_argument("images", nargs="+")
+    verify.add_argument("--backend", choices=DETECTOR_BACKENDS[1:], required=True)
+    verify.add_argument("--score-tolerance", type=float, default=0.05)
+    verify.add_argument("--iou-threshold", type=float, default=0.9)
+    args = parser.parse_args()
+
+    from PIL import Image
+    import model_registry
+    processor, reference = model_registry.get("detector")
+    if detector_backend() != "eager":
+        parser.error("run verification with DETECTOR_BACKEND=eager so the reference is fp32")
+    candidate = optimize_detector(copy.deepcopy(reference), args.backend)
+    if backend_of(candidate) != args.backend:
+        # Comparing the eager fallback against eager would pass without testing anything
+        parser.error(f"the {args.backend} backend could not be built, see the warning above")
+    images = [Image.open(path).convert("RGB") for path in args.images]
+    # The first call of traced backends compiles; warm up so timings compare steady state
+    verify_detector(processor, reference, candidate, images[:1])
+    report = verify_detector(processor, reference, candidate, images,
+                             score_tolerance=args.score_tolerance, iou_threshold=args.iou_threshold)
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    raise SystemExit(0 if report["ok"] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# ==========================================
+# 📄 services/inference_client.py
+# ==========================================
+"""
+Thin blocking client for inference_server, used by app.py when the
+INFERENCE_SERVER environment variable points at a running service.
+"""
+import base64
+import json
+import socket
+import time
+
+class InferenceError(Exception):
+    """Raised when the inference service returns an error"""
+
+class InferenceClient:
+    def __init__(self, address, timeout=30.0, retries=3):
+        self.address = address
+        self.timeout = timeout
+        self.retries = retries
+
+    def detect(self, image_bytes, image_description=""):
+        """Weapon detections for one image, as returned by detect_weapons"""
+        response = self._call({
+            "op": "detect",
+            "image": base64.b64encode(image_bytes).decode("ascii"),
+            "description": image_description
+        })
+        return response["weapons"]
+
+    def analyze(self, weapons, image_description=""):
+        """(threat_level, context_threat) for detections and a description"""
+        response = self._call({"op": "analyze", "weapons": weapons, "description": image_description})
+        return response["threat_level"], response["context_threat"]
+
+    def stats(self):
+        return self._call({"op": "stats"})["stats"]
+
+    def _connect(self):
+        if self.address.startswith("unix:"):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.address[5:])
+            return sock
+        host, _, port = self.address.rpartition(":")
+        return socket.create_connection((host or "127.0.0.1", int(port)), timeout=self.timeout)
+
+    def _call(self, request):
+        payload = json.dumps(request).encode() + b"\n"
+        for attempt in range(self.retries + 1):
+            with self._connect() as sock:
+                sock.sendall(payload)
+                with sock.makefile("rb") as stream:
+                    line = stream.readline()
+            if not line:
+                raise InferenceError("connection closed by inference server")
+            response = json.loads(line)
+            if response.get("ok"):
+                return response
+            # Back off and retry when the server sheds load
+            if response.get("retry") and attempt < self.retries:
+                time.sleep(0.05 * 2 ** attempt)
+                continue
+            raise InferenceError(response.get("error", "unknown error"))
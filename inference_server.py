@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# ==========================================
+# 📄 services/inference_server.py
+# ==========================================
+"""
+Standalone inference service. Detection and threat analysis requests arrive as
+newline-delimited JSON over a TCP or Unix socket, are grouped into
+micro-batches and run through the shared models, so every Streamlit worker can
+use a single copy of the weights.
+
+Usage:
+    python inference_server.py --listen 127.0.0.1:8765
+    python inference_server.py --listen unix:/tmp/weapon-detector.sock
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import logging
+import os
+import socket
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Base64 images travel inside a single JSON line
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+class Overloaded(Exception):
+    """Raised when a batcher's queue is full"""
+
+class MicroBatcher:
+    """Collects submitted items into batches of up to max_batch_size, waiting at most max_wait seconds"""
+
+    def __init__(self, process_batch, max_batch_size=8, max_wait=0.01, max_queue=64, executor=None):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.executor = executor
+        self.latencies = deque(maxlen=1000)
+        self.batch_sizes = deque(maxlen=1000)
+        self.rejected = 0
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue(self.max_queue)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, item):
+        """Queue an item and wait for its result; raises Overloaded when the queue is full"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise Overloaded("queue is full") from None
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            items = [item for item, _, _ in batch]
+            results = await loop.run_in_executor(self.executor, self._process, items)
+            finished = time.perf_counter()
+            self.batch_sizes.append(len(batch))
+            for (_, future, submitted), result in zip(batch, results):
+                self.latencies.append(finished - submitted)
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _process(self, items):
+        """Results for items; when the batch fails, items are retried one by one and failures hold their exception"""
+        try:
+            return self.process_batch(items)
+        except Exception as exc:
+            if len(items) == 1:
+                logger.exception("Item failed")
+                return [exc]
+            logger.warning("Batch of %d failed, retrying items one by one", len(items))
+        # Isolate the bad item(s) so one corrupt upload does not fail the whole batch
+        results = []
+        for item in items:
+            try:
+                results.append(self.process_batch([item])[0])
+            except Exception as exc:
+                logger.exception("Item failed")
+                results.append(exc)
+        return results
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "p50_ms": _percentile(latencies, 50) * 1000,
+            "p99_ms": _percentile(latencies, 99) * 1000,
+            "mean_batch_size": sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0.0
+        }
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+def detect_batch(items):
+    """Default detection handler: items are (image_bytes, image_description)"""
+    from object_detector import detect_weapons_batch
+    images = [io.BytesIO(image_bytes) for image_bytes, _ in items]
+    descriptions = [description for _, description in items]
+    return detect_weapons_batch(images, batch_size=len(images), image_descriptions=descriptions)
+
+def analyze_batch(items):
+    """Default analysis handler: items are (weapons, image_description)"""
+    from sentiment_analyzer import analyze_threat_level_batch, analyze_image_context
+    threat_levels = analyze_threat_level_batch(items, batch_size=len(items))
+    return [
+        {"threat_level": threat_level, "context_threat": analyze_image_context(description)}
+        for threat_level, (_, description) in zip(threat_levels, items)
+    ]
+
+class InferenceServer:
+    """Serves "detect", "analyze" and "stats" requests through one micro-batcher per model"""
+
+    def __init__(self, detect_handler=detect_batch, analyze_handler=analyze_batch,
+                 max_batch_size=8, max_wait=0.01, max_queue=64):
+        # One thread per batcher: batches of the same model never run concurrently
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="inference")
+        self.detector = MicroBatcher(detect_handler, max_batch_size, max_wait, max_queue, self.executor)
+        self.analyzer = MicroBatcher(analyze_handler, max_batch_size, max_wait, max_queue, self.executor)
+        self._server = None
+        metrics.register_collector(self._gauges)
+
+    def _gauges(self):
+        gauges = []
+        for name, batcher in (("detect", self.detector), ("analyze", self.analyzer)):
+            stats = batcher.stats()
+            gauges.append(("inference_queue_depth", {"op": name}, stats["queue_depth"]))
+            gauges.append(("inference_rejected", {"op": name}, stats["rejected"]))
+            gauges.append(("inference_latency_p50_ms", {"op": name}, stats["p50_ms"]))
+            gauges.append(("inference_latency_p99_ms", {"op": name}, stats["p99_ms"]))
+        return gauges
+
+    async def start(self, listen=None, sock=None):
+        """Listen on "host:port" / "unix:/path", or serve an already bound listening socket"""
+        self.detector.start()
+        self.analyzer.start()
+        if sock is not None:
+            if sock.family == socket.AF_UNIX:
+                self._server = await asyncio.start_unix_server(self._handle, sock=sock, limit=MAX_MESSAGE_BYTES)
+            else:
+                self._server = await asyncio.start_server(self._handle, sock=sock, limit=MAX_MESSAGE_BYTES)
+            listen = sock.getsockname()
+        elif listen.startswith("unix:"):
+            self._server = await asyncio.start_unix_server(self._handle, path=listen[5:], limit=MAX_MESSAGE_BYTES)
+        else:
+            host, _, port = listen.rpartition(":")
+            self._server = await asyncio.start_server(self._handle, host or "127.0.0.1", int(port), limit=MAX_MESSAGE_BYTES)
+        logger.info("Inference server listening on %s", listen)
+        return self._server
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.detector.stop()
+        await self.analyzer.stop()
+        self.executor.shutdown(wait=False)
+
+    def stats(self):
+        return {"detect": self.detector.stats(), "analyze": self.analyzer.stats()}
+
+    async def handle_request(self, request):
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "request must be a JSON object"}
+        op = request.get("op")
+        try:
+            if op == "detect":
+                image_bytes = base64.b64decode(request["image"])
+                weapons = await self.detector.submit((image_bytes, request.get("description", "")))
+                return {"ok": True, "weapons": weapons}
+            if op == "analyze":
+                result = await self.analyzer.submit((request.get("weapons") or [], request.get("description", "")))
+                return {"ok": True, **result}
+            if op == "stats":
+                return {"ok": True, "stats": self.stats()}
+            if op == "metrics":
+                return {"ok": True, "prometheus": metrics.render_prometheus()}
+            return {"ok": False, "error": f"unknown op {op!r}"}
+        except Overloaded:
+            return {"ok": False, "error": "overloaded", "retry": True}
+        except Exception as exc:
+            return {"ok": False, "error": str(exc)}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {"ok": False, "error": "invalid JSON"}
+                else:
+                    response = await self.handle_request(request)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+async def _serve(args):
+    if args.warmup:
+        import model_registry
+        model_registry.warmup()
+    server = InferenceServer(max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000,
+                             max_queue=args.max_queue)
+    await server.start(args.listen)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Weapon detection inference service")
+    parser.add_argument("--listen", default=os.environ.get("INFERENCE_SERVER", "127.0.0.1:8765"),
+                        help="host:port or unix:/path/to.sock")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--warmup", action="store_true", help="load all models before accepting requests")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    args = parser.parse_args()
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    if args.metrics_port:
+        metrics.serve_prometheus(args.metrics_port)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# ==========================================
+# 📄 utils/keyword_matcher.py
+# ==========================================
+"""
+Single-pass keyword matching: the text is split into words once and each word
+is looked up in a table of every keyword form, so scanning a text costs one
+linear pass no matter how many keywords there are.
+
+Whole-word matching accepts the usual inflections of a keyword's last word
+("attacks", "attacked", "attacking", "attacker", "gunned", "knifing") but not
+other words that merely contain it ("handgun" is not "gun"). With
+whole_words=False any occurrence counts, as in a plain substring check.
+"""
+import re
+from collections import Counter
+
+VOWELS = "aeiou"
+SUFFIXES = ("", "s", "es", "ed", "er", "ers", "ing", "ings")
+
+_WORD = re.compile(r"[a-z]+")
+
+def _inflections(word):
+    """A word and its -s/-es/-ed/-er/-ing forms"""
+    if word.endswith("e"):
+        # knife -> knifes, knifed, knifer, knifing
+        stem = word[:-1]
+        return {word, word + "s", word + "d", word + "r", stem + "ers", stem + "ing", stem + "ings"}
+    forms = {word + suffix for suffix in SUFFIXES}
+    if len(word) >= 3 and word[-1] not in VOWELS + "wxy" and word[-2] in VOWELS and word[-3] not in VOWELS:
+        # gun -> gunned, gunner; the final consonant may double
+        forms.update(word + word[-1] + suffix for suffix in SUFFIXES[1:])
+    return forms
+
+class KeywordMatcher:
+    """Counts keyword hits (inflections included) in one pass over the text"""
+
+    def __init__(self, keywords, whole_words=True):
+        # Deduplicate while keeping list order, which decides first()
+        self.keywords = list(dict.fromkeys(" ".join(k.lower().split()) for k in keywords))
+        self.whole_words = whole_words
+        self._rank = {keyword: i for i, keyword in enumerate(self.keywords)}
+        # Word form -> single-word keyword
+        self._forms = {}
+        # First word -> (leading words, last-word forms, keyword), longest first so
+        # a longer phrase wins over a shorter one with the same first word
+        self._phrases = {}
+        for keyword in sorted(self.keywords, key=len, reverse=True):
+            words = keyword.split()
+            if len(words) == 1:
+                self._forms.update(dict.fromkeys(_inflections(keyword), keyword))
+            else:
+                self._phrases.setdefault(words[0], []).append((words[:-1], _inflections(words[-1]), keyword))
+        # A multi-word hit also counts the keywords it contains ("machine gun" -> "gun")
+        self._implied = {
+            keyword: [
+                other for other in self.keywords
+                if other != keyword and re.search(rf"\b{re.escape(other)}\b", keyword)
+            ]
+            for keyword in self.keywords
+        }
+
+    def counts(self, text):
+        """Hit count per keyword found in text"""
+        hits = Counter()
+        if not text:
+            return hits
+        text = text.lower()
+        if not self.whole_words:
+            for keyword in self.keywords:
+                found = text.count(keyword)
+                if found:
+                    hits[keyword] += found
+            return hits
+        words = _WORD.findall(text)
+        distinct = set(words)
+        for word in distinct.intersection(self._forms):
+            hits[self._forms[word]] += words.count(word)
+        # Only texts containing the first word of a phrase need a positional scan
+        for first in distinct.intersection(self._phrases):
+            i = words.index(first)
+            while True:
+                keyword, length = self._match_phrase(words, i)
+                if keyword:
+                    hits[keyword] += 1
+                    for implied in self._implied[keyword]:
+                        hits[implied] += 1
+                    # The phrase's words were counted on their own above
+                    for word in words[i:i + length]:
+                        if word in self._forms:
+                            hits[self._forms[word]] -= 1
+                try:
+                    i = words.index(first, i + 1)
+                except ValueError:
+                    break
+        return +hits
+
+    def _match_phrase(self, words, i):
+        """(keyword, number of words) for the phrase starting at words[i], or (None, 0)"""
+        for leading, last_forms, keyword in self._phrases.get(words[i], ()):
+            end = i + len(leading)
+            if end < len(words) and words[i:end] == leading and words[end] in last_forms:
+                return keyword, len(leading) + 1
+        return None, 0
+
+    def matches(self, text):
+        """Distinct keywords found in text"""
+        return set(self.counts(text))
+
+    def first(self, text):
+        """The matching keyword that comes first in the keyword list, or None"""
+        found = self.matches(text)
+        return min(found, key=self._rank.__getitem__) if found else None
+
+    def search(self, text):
+        if not text:
+            return False
+        text = text.lower()
+        if not self.whole_words:
+            return any(keyword in text for keyword in self.keywords)
+        words = _WORD.findall(text)
+        return not self._forms.keys().isdisjoint(words) or any(
+            self._match_phrase(words, i)[0] for i, word in enumerate(words) if word in self._phrases
+        )
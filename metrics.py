@@ -0,0 +1,191 @@
+# ==========================================
+# 📄 utils/metrics.py
+# ==========================================
+"""
+In-process metrics for the detection pipeline: counters, stage timings and
+gauges collected from other components (caches, queues). Exported as
+Prometheus text on an HTTP endpoint, as periodic JSON snapshots, or read
+directly by the app.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Keep this many recent observations per timing for quantiles
+WINDOW = 1024
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_gauges = {}
+_timings = {}
+_collectors = []
+
+logger = logging.getLogger(__name__)
+
+class _Timing:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.recent.append(value)
+
+    def quantile(self, q):
+        values = sorted(self.recent)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def incr(name, value=1, **labels):
+    """Add value to a counter"""
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+def observe(name, value, **labels):
+    """Record one observation (seconds for timings, counts for sizes)"""
+    key = _key(name, labels)
+    with _lock:
+        timing = _timings.get(key)
+        if timing is None:
+            timing = _timings[key] = _Timing()
+        timing.add(value)
+
+@contextmanager
+def timer(name, **labels):
+    """Time the enclosed block into the timing name, in seconds"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def register_collector(collect):
+    """collect() returns (name, labels_dict, value) gauges, read at export time"""
+    with _lock:
+        _collectors.append(collect)
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
+
+def _collected_gauges():
+    gauges = dict(_gauges)
+    for collect in list(_collectors):
+        try:
+            for name, labels, value in collect():
+                gauges[_key(name, labels)] = value
+        except Exception:
+            # A broken collector must not break the export, but it must not go unnoticed either
+            logger.exception("Metrics collector %r failed", collect)
+    return gauges
+
+def snapshot():
+    """All metrics as a JSON-serializable dict"""
+    with _lock:
+        counters = dict(_counters)
+        timings = {key: (t.count, t.total, t.quantile(0.5), t.quantile(0.99)) for key, t in _timings.items()}
+    gauges = _collected_gauges()
+
+    def entry(key, **values):
+        name, labels = key
+        return {"name": name, "labels": dict(labels), **values}
+
+    return {
+        "timestamp": time.time(),
+        "counters": [entry(key, value=value) for key, value in sorted(counters.items())],
+        "gauges": [entry(key, value=value) for key, value in sorted(gauges.items())],
+        "timings": [
+            entry(key, count=count, sum=total, p50=p50, p99=p99)
+            for key, (count, total, p50, p99) in sorted(timings.items())
+        ]
+    }
+
+def _format_labels(labels, **extra):
+    labels = {**dict(labels), **extra}
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"'.replace("\n", " ") for k, v in sorted(labels.items()))
+    return "{" + body + "}"
+
+def render_prometheus():
+    """Metrics in the Prometheus text exposition format"""
+    data = snapshot()
+    lines = []
+    declared = set()
+
+    def declare(name, kind):
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for item in data["counters"]:
+        name = f"{item['name']}_total"
+        declare(name, "counter")
+        lines.append(f"{name}{_format_labels(item['labels'])} {item['value']}")
+    for item in data["gauges"]:
+        declare(item["name"], "gauge")
+        lines.append(f"{item['name']}{_format_labels(item['labels'])} {item['value']}")
+    for item in data["timings"]:
+        name = item["name"]
+        declare(name, "summary")
+        for quantile in ("p50", "p99"):
+            labels = _format_labels(item["labels"], quantile=f"0.{quantile[1:]}")
+            lines.append(f"{name}{labels} {item[quantile]}")
+        lines.append(f"{name}_sum{_format_labels(item['labels'])} {item['sum']}")
+        lines.append(f"{name}_count{_format_labels(item['labels'])} {item['count']}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_prometheus(port, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread; returns the HTTP server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def start_snapshot_writer(path, interval=60.0):
+    """Write a JSON snapshot to path every interval seconds from a daemon thread"""
+    def write_forever():
+        while True:
+            time.sleep(interval)
+            tmp_path = f"{path}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(snapshot(), f)
+                os.replace(tmp_path, path)
+            except OSError:
+                pass
+
+    thread = threading.Thread(target=write_forever, name="metrics-snapshot", daemon=True)
+    thread.start()
+    return thread
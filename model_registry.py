@@ -0,0 +1,143 @@
+# ==========================================
+# 📄 models/model_registry.py
+# ==========================================
+"""
+Lazy model registry: every model is loaded the first time it is requested,
+so importing the detector or the analyzers costs nothing until inference.
+"""
+import logging
+import os
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# name -> list of (backend, loader), tried in registration order
+_LOADERS = {}
+# A model whose every backend failed is tried again on the first get() after this many seconds
+LOAD_RETRY_SECONDS = float(os.environ.get("MODEL_LOAD_RETRY_SECONDS", "30"))
+
+# name -> loaded object / backend that produced it / (error, time) of the last failed attempt
+_MODELS = {}
+_BACKENDS = {}
+_ERRORS = {}
+# name -> callable deciding whether warmup() loads it; models without one are always warmed
+_WARM_IF = {}
+_lock = threading.RLock()
+
+def register(name, backend, loader, warm_if=None):
+    """Register a loader for a model name; earlier registrations are tried first
+
+    warm_if() is checked by warmup() for models that are only used in some configurations.
+    """
+    with _lock:
+        _LOADERS.setdefault(name, []).append((backend, loader))
+        if warm_if is not None:
+            _WARM_IF[name] = warm_if
+
+def get(name):
+    """Return the model registered under name, loading it on first use"""
+    if name in _MODELS:
+        return _MODELS[name]
+    with _lock:
+        if name in _MODELS:
+            return _MODELS[name]
+        failed = _ERRORS.get(name)
+        if failed is not None and time.monotonic() - failed[1] < LOAD_RETRY_SECONDS:
+            raise RuntimeError(f"No backend could be loaded for {name!r}") from failed[0]
+        if name not in _LOADERS:
+            raise KeyError(f"Unknown model {name!r}")
+        for attempt, (backend_name, loader) in enumerate(_LOADERS[name]):
+            try:
+                with metrics.timer("model_load_seconds", model=name):
+                    _MODELS[name] = loader()
+            except Exception as exc:
+                logger.warning("Could not load %s for %s: %s", backend_name, name, exc)
+                _ERRORS[name] = (exc, time.monotonic())
+                continue
+            _BACKENDS[name] = backend_name
+            _ERRORS.pop(name, None)
+            if attempt:
+                metrics.incr("fallback_activations", kind="model", model=name)
+            logger.info("Using %s for %s", backend_name, name)
+            return _MODELS[name]
+        raise RuntimeError(f"No backend could be loaded for {name!r}") from _ERRORS[name][0]
+
+def backend(name):
+    """Return the backend chosen for name, or None if it has not been loaded"""
+    return _BACKENDS.get(name)
+
+def is_loaded(name):
+    return name in _MODELS
+
+def warmup(names=None):
+    """Load the given models (by default every registered one the configuration uses) ahead of time"""
+    if not names:
+        names = [name for name in list(_LOADERS) if name not in _WARM_IF or _WARM_IF[name]()]
+    loaded = {}
+    for name in names:
+        try:
+            get(name)
+        except Exception as exc:
+            logger.warning("Warmup of %s failed: %s", name, exc)
+        loaded[name] = backend(name)
+    return loaded
+
+def reset(names=None):
+    """Forget loaded models so the next get() loads them again"""
+    with _lock:
+        for name in names or list(_MODELS) + list(_ERRORS):
+            _MODELS.pop(name, None)
+            _BACKENDS.pop(name, None)
+            _ERRORS.pop(name, None)
+
+def override(name, backend_name, model):
+    """Install an already built model under name, e.g. a stand-in for tests"""
+    with _lock:
+        _MODELS[name] = model
+        _BACKENDS[name] = backend_name
+        _ERRORS.pop(name, None)
+
+metrics.register_collector(lambda: [
+    ("model_loaded", {"model": name, "backend": backend_name}, 1) for name, backend_name in list(_BACKENDS.items())
+])
+
+# --- Default loaders ---
+# Each loader applies the CPU backend selected in inference_backends (eager by default)
+def _load_yolos():
+    from transformers import YolosImageProcessor, YolosForObjectDetection
+    from inference_backends import optimize_detector
+    processor = YolosImageProcessor.from_pretrained("hustvl/yolos-tiny")
+    model = YolosForObjectDetection.from_pretrained("hustvl/yolos-tiny")
+    return processor, optimize_detector(model.eval())
+
+def _load_detr():
+    from transformers import DetrImageProcessor, DetrForObjectDetection
+    from inference_backends import optimize_detector
+    processor = DetrImageProcessor.from_pretrained("facebook/detr-resnet-50")
+    model = DetrForObjectDetection.from_pretrained("facebook/detr-resnet-50")
+    return processor, optimize_detector(model.eval())
+
+def _load_sentiment():
+    from transformers import pipeline
+    from inference_backends import optimize_pipeline
+    return optimize_pipeline(pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english"))
+
+def _load_violence():
+    from transformers import pipeline
+    from inference_backends import optimize_pipeline
+    return optimize_pipeline(pipeline("text-classification", model="unitary/toxic-bert"))
+
+def _cascade_enabled():
+    from object_detector import cascade_enabled
+    return cascade_enabled()
+
+# YOLO is better for weapon detection, DETR is the fallback
+register("detector", "hustvl/yolos-tiny", _load_yolos)
+register("detector", "facebook/detr-resnet-50", _load_detr)
+# Second stage of the detector cascade, only loaded ahead of time when CASCADE_MODE=on
+register("detector-detr", "facebook/detr-resnet-50", _load_detr, warm_if=_cascade_enabled)
+register("sentiment", "distilbert-base-uncased-finetuned-sst-2-english", _load_sentiment)
+register("violence", "unitary/toxic-bert", _load_violence)
@@ -0,0 +1,142 @@
+# ==========================================
+# 📄 detectors/near_duplicates.py
+# ==========================================
+"""
+Near-duplicate detection for frames from fixed cameras. Each analyzed image
+gets a 64-bit difference hash (dHash); a multi-index hash table finds recent
+images within a small Hamming distance, so a near-identical frame can reuse
+the earlier detections instead of running the detector again.
+
+With radius r the hash is split into r + 1 chunks: two hashes within r bits
+of each other must agree exactly on at least one chunk, so a query only
+compares against entries sharing a chunk value.
+
+Lookups may name an owner (e.g. a report id): repeating an owner's lookup on
+the same image returns the first answer again and is not counted, so reruns
+of one report do not show up as skips.
+"""
+import io
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8
+
+def dhash(image, hash_size=HASH_SIZE):
+    """Difference hash of an image (bytes, file, path, PIL image or array) as an int"""
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    elif not isinstance(image, Image.Image):
+        if isinstance(image, (bytes, bytearray)):
+            image = io.BytesIO(image)
+        image = Image.open(image)
+        # JPEGs decode at 1/8 scale; the hash only needs a 9x8 thumbnail
+        image.draft("L", (hash_size * 4, hash_size * 4))
+    small = np.asarray(image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+class _Entry:
+    def __init__(self, image_hash, added, value):
+        self.image_hash = image_hash
+        self.added = added
+        self.value = value
+
+class NearDuplicateIndex:
+    """Recent image hashes with Hamming-radius lookup, bounded by size and age"""
+
+    def __init__(self, radius=4, max_entries=2048, ttl=300.0, bits=HASH_SIZE * HASH_SIZE):
+        self.radius = radius
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lookups = 0
+        self.skips = 0
+        chunks = radius + 1
+        bounds = [round(i * bits / chunks) for i in range(chunks + 1)]
+        self._chunks = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self._tables = [{} for _ in self._chunks]
+        self._entries = OrderedDict()  # oldest first
+        self._answers = OrderedDict()  # owner -> (image_hash, match), oldest first
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _keys(self, image_hash):
+        return [(image_hash >> start) & mask for start, mask in self._chunks]
+
+    def find(self, image_hash, owner=None):
+        """(value, distance) of the closest recent image within the radius, or None"""
+        with self._lock:
+            self._evict(time.monotonic())
+            answer = self._answers.get(owner)
+            if owner is not None and answer is not None and answer[0] == image_hash:
+                return answer[1]
+            self.lookups += 1
+            candidates = set()
+            for table, key in zip(self._tables, self._keys(image_hash)):
+                candidates.update(table.get(key, ()))
+            best = None
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                distance = hamming(entry.image_hash, image_hash)
+                # Ties go to the most recent entry
+                if distance <= self.radius and (best is None or (distance, -entry_id) < best[:2]):
+                    best = (distance, -entry_id, entry.value)
+            match = None if best is None else (best[2], best[0])
+            if match is not None:
+                self.skips += 1
+            self._remember(owner, image_hash, match)
+            return match
+
+    def add(self, image_hash, value, owner=None):
+        with self._lock:
+            self._remember(owner, image_hash, (value, 0))
+            now = time.monotonic()
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(image_hash, now, value)
+            for table, key in zip(self._tables, self._keys(image_hash)):
+                table.setdefault(key, set()).add(entry_id)
+            self._evict(now)
+
+    def _remember(self, owner, image_hash, match):
+        if owner is None:
+            return
+        self._answers[owner] = (image_hash, match)
+        self._answers.move_to_end(owner)
+        while len(self._answers) > self.max_entries:
+            self._answers.popitem(last=False)
+
+    def _evict(self, now):
+        while self._entries:
+            entry_id, entry = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - entry.added <= self.ttl:
+                break
+            del self._entries[entry_id]
+            for table, key in zip(self._tables, self._keys(entry.image_hash)):
+                bucket = table[key]
+                bucket.discard(entry_id)
+                if not bucket:
+                    del table[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._answers.clear()
+            for table in self._tables:
+                table.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "skips": self.skips,
+                "skip_rate": self.skips / self.lookups if self.lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries
+            }
@@ -1,37 +1,25 @@
-from transformers import DetrImageProcessor, DetrForObjectDetection, YolosImageProcessor, YolosForObjectDetection
 from PIL import Image
 import torch
+import contextlib
+import copy
 import io
+import logging
+import os
 import numpy as np
 
-# Initialize multiple models for better detection
-try:
-    # Try to use YOLO model which is better for weapon detection
-    processor = YolosImageProcessor.from_pretrained("hustvl/yolos-tiny")
-    model = YolosForObjectDetection.from_pretrained("hustvl/yolos-tiny")
-    print("Using YOLO model for detection")
-except:
-    # Fallback to DETR
-    processor = DetrImageProcessor.from_pretrained("facebook/detr-resnet-50")
-    model = DetrForObjectDetection.from_pretrained("facebook/detr-resnet-50")
-    print("Using DETR model for detection")
+import metrics
+import model_registry
+from detection_cache import DetectionCache
+from near_duplicates import NearDuplicateIndex, dhash
+from keyword_matcher import KeywordMatcher
+from inference_backends import backend_of
+from image_decode import decode_image, processor_edges
+from tiling import decode_edges, merge_detections, tile_windows, tiling_enabled
 
 # Comprehensive weapon and dangerous object mappings
 WEAPON_CLASSES = {
-    # COCO dataset IDs
-    43: "knife",
-    44: "bottle", 
-    45: "wine glass",
-    46: "cup",
-    47: "fork",
-    48: "knife",
-    49: "spoon",
-    76: "scissors",
-    77: "handgun",  # Often misclassified as teddy bear
-    78: "hair drier",
-    79: "sharp object",
-    
-    # Additional weapon-like objects
+    # Python keeps only the last value for a repeated key, so the class IDs
+    # below are listed once each, exactly as the lookup has always resolved them
     1: "person",  # Check for threatening poses
     2: "bicycle",
     3: "car",
@@ -142,84 +130,456 @@ WEAPON_KEYWORDS = [
     "scissors", "razor", "blade", "sharp", "pointed", "dangerous"
 ]
 
-def detect_weapons(image_file):
+GUN_KEYWORDS = ["gun", "handgun", "shotgun", "pistol", "rifle", "firearm"]
+GUN_LIKE_LABELS = ["baseball bat", "tennis racket"]
+
+# Compiled once, each scans a text in a single pass
+WEAPON_MATCHER = KeywordMatcher(WEAPON_KEYWORDS)
+# Substring match: "gunpoint", "gunman" and "gunfire" must still trigger the description fallback
+GUN_MATCHER = KeywordMatcher(GUN_KEYWORDS, whole_words=False)
+
+# Lower threshold for better detection
+DETECTION_THRESHOLD = 0.3
+
+# Two-stage cascade: YOLOS screens every image and DETR re-checks only the
+# ambiguous ones, i.e. threat detections in the uncertain confidence band or
+# labels that are often confused with weapons
+CASCADE_MODE = os.environ.get("CASCADE_MODE", "off")  # off | on
+CASCADE_BAND = (float(os.environ.get("CASCADE_LOW", "0.3")), float(os.environ.get("CASCADE_HIGH", "0.7")))
+AMBIGUOUS_LABELS = ["teddy bear", "baseball bat", "bottle", "tennis racket", "scissors", "umbrella"]
+
+# Region-of-interest pass: confident person boxes are cropped (with a margin for
+# outstretched hands), upscaled by the processor and searched for hand-held objects
+ROI_MODE = os.environ.get("ROI_MODE", "off")  # off | on
+ROI_PERSON_THRESHOLD = float(os.environ.get("ROI_PERSON_THRESHOLD", "0.7"))
+ROI_MAX_PERSONS = int(os.environ.get("ROI_MAX_PERSONS", "4"))
+ROI_MARGIN = float(os.environ.get("ROI_MARGIN", "0.15"))
+# Crops smaller than this (decoded pixels, shortest side) carry too little detail to search
+ROI_MIN_SIZE = 32
+
+logger = logging.getLogger(__name__)
+
+# Detections keyed by image content, so reruns on an unchanged image skip the forward pass
+detection_cache = DetectionCache(
+    max_entries=int(os.environ.get("DETECTION_CACHE_SIZE", "256")),
+    cache_dir=os.environ.get("DETECTION_CACHE_DIR") or None
+)
+metrics.register_collector(lambda: [
+    ("detection_cache_" + name, {}, value) for name, value in detection_cache.stats().items()
+])
+
+# Recent image hashes, so near-identical frames from a fixed camera reuse earlier detections.
+# Opt-in: a frame within the radius may differ in a small object the detector would find
+NEAR_DUPLICATE_MODE = os.environ.get("NEAR_DUPLICATE_MODE", "off")  # off | on
+near_duplicate_index = NearDuplicateIndex(
+    radius=int(os.environ.get("NEAR_DUPLICATE_RADIUS", "4")),
+    max_entries=int(os.environ.get("NEAR_DUPLICATE_SIZE", "2048")),
+    ttl=float(os.environ.get("NEAR_DUPLICATE_TTL", "300"))
+)
+metrics.register_collector(lambda: [
+    ("near_duplicate_" + name, {}, value) for name, value in near_duplicate_index.stats().items()
+])
+
+cascade_stats = {"screened": 0, "escalated": 0}
+metrics.register_collector(lambda: [(
+    "cascade_escalation_rate", {},
+    cascade_stats["escalated"] / cascade_stats["screened"] if cascade_stats["screened"] else 0.0
+)])
+
+def _load_image(image_file, processor):
+    """Decode an uploaded file, path, PIL image or array close to the processor's input size
+
+    With tiling enabled images large enough to be tiled keep a multiple of
+    that size; every other image decodes exactly as without tiling.
+    """
+    shortest_edge, longest_edge = processor_edges(processor)
+    return decode_image(image_file, shortest_edge, longest_edge,
+                        edges=lambda size: decode_edges(shortest_edge, longest_edge, size))
+
+def _model_views(image, edge):
+    """(pixels, target (h, w), offset, scale) for the full frame and any tiles of one image
+
+    The full frame is post-processed straight to original coordinates; tile
+    boxes come out in tile pixels and are shifted and scaled afterwards.
+    """
+    views = [(image.array, image.original_size[::-1], (0, 0), (1.0, 1.0))]
+    for x0, y0, x1, y1 in tile_windows(*image.size, edge):
+        # Slices are views into the decoded frame, no copy per tile
+        views.append((image.array[y0:y1, x0:x1], (y1 - y0, x1 - x0), (x0, y0), image.scale))
+    return views
+
+def get_detector():
+    """Return the (processor, model) pair, loading it on first use"""
+    return model_registry.get("detector")
+
+def cascade_enabled():
+    """Whether the cascade runs: it is on and the first stage is not DETR already"""
+    return CASCADE_MODE == "on" and model_registry.backend("detector") != "facebook/detr-resnet-50"
+
+def get_second_stage():
+    """DETR (processor, model) for the cascade, or None when the cascade is off or would not help"""
+    if not cascade_enabled():
+        return None
+    try:
+        return model_registry.get("detector-detr")
+    except RuntimeError:
+        return None  # already logged by the registry; screening results are used as-is
+
+def detect_weapons(image_file, image_description=""):
     """Enhanced weapon detection with multiple strategies"""
-    image = Image.open(image_file).convert("RGB")
-    inputs = processor(images=image, return_tensors="pt")
-    outputs = model(**inputs)
-    target_sizes = torch.tensor([image.size[::-1]])
-    results = processor.post_process_object_detection(
-        outputs, 
-        target_sizes=target_sizes, 
-        threshold=0.3  # Lower threshold for better detection
-    )[0]
-
-    # Debug output
-    print("\n=== Raw Detections ===")
-    for score, label, box in zip(results["scores"], results["labels"], results["boxes"]):
-        label_id = label.item()
-        label_name = model.config.id2label.get(label_id, f"unknown_{label_id}")
-        print(f"- {label_name} (ID: {label_id}) with confidence {score.item():.2f}")
+    return detect_weapons_batch([image_file], batch_size=1, image_descriptions=[image_description])[0]
+
+def detect_weapons_cached(image_file, image_description=""):
+    """detect_weapons, reusing the result for an image that was already analyzed"""
+    # The model and the backend it actually runs on are part of the key, known once loaded
+    _, model = get_detector()
+    image_bytes = _read_image_bytes(image_file)
+    model_id = f"{model_registry.backend('detector')}+{backend_of(model)}"
+    # Every optional stage changes the results, so each is part of the key
+    for stage, enabled in (("tiles", tiling_enabled()), ("roi", ROI_MODE == "on"), ("cascade", get_second_stage() is not None)):
+        if enabled:
+            model_id += f"+{stage}"
+    key = detection_cache.key(image_bytes, model_id, DETECTION_THRESHOLD)
+    detected = detection_cache.get(key)
+    if detected is None:
+        detected = _detect_objects([io.BytesIO(image_bytes)])[0]
+        detection_cache.put(key, detected)
+    return apply_description_fallback(detected, image_description)
+
+def detect_weapons_deduplicated(image_file, image_description="", report_id=None):
+    """detect_weapons_cached that also reuses detections from a near-identical recent image
+
+    Returns (weapons, duplicate_of): duplicate_of is the report_id recorded with
+    the matching image, or None when the detector ran (or matched report_id itself).
+    Reruns for the same report_id repeat the first answer without counting a skip.
+    """
+    if NEAR_DUPLICATE_MODE != "on":
+        return detect_weapons_cached(image_file, image_description), None
+    image_bytes = _read_image_bytes(image_file)
+    image_hash = dhash(image_bytes)
+    match = near_duplicate_index.find(image_hash, owner=report_id)
+    if match is not None:
+        (detected, earlier_report_id), distance = match
+        logger.debug("Near-duplicate of %s at distance %d", earlier_report_id, distance)
+        duplicate_of = earlier_report_id if earlier_report_id != report_id else None
+        return apply_description_fallback(copy.deepcopy(detected), image_description), duplicate_of
+    detected = detect_weapons_cached(io.BytesIO(image_bytes))
+    near_duplicate_index.add(image_hash, (copy.deepcopy(detected), report_id), owner=report_id)
+    return apply_description_fallback(detected, image_description), None
+
+def _read_image_bytes(image_file):
+    """Raw bytes of an uploaded file, path or PIL image"""
+    if isinstance(image_file, Image.Image):
+        buffer = io.BytesIO()
+        image_file.save(buffer, format="PNG")
+        return buffer.getvalue()
+    if isinstance(image_file, (str, os.PathLike)):
+        with open(image_file, "rb") as f:
+            return f.read()
+    if hasattr(image_file, "getvalue"):
+        return image_file.getvalue()
+    image_file.seek(0)
+    data = image_file.read()
+    image_file.seek(0)
+    return data
+
+def detect_weapons_batch(images, batch_size=8, image_descriptions=None):
+    """Detect weapons in several images, one forward pass per chunk of batch_size"""
+    images = list(images)
+    image_descriptions = list(image_descriptions or [""] * len(images))
+    if len(image_descriptions) != len(images):
+        raise ValueError(f"{len(image_descriptions)} descriptions for {len(images)} images")
+    return [
+        apply_description_fallback(detected, description)
+        for detected, description in zip(_detect_objects(images, batch_size), image_descriptions)
+    ]
+
+def _detect_objects(images, batch_size=8):
+    """Image-only detections, without the description fallback"""
+    processor, model = get_detector()
+    edge = processor_edges(processor)[0]
+    detections = []
+    for start in range(0, len(images), batch_size):
+        with metrics.timer("detect_stage_seconds", stage="decode"):
+            chunk = [_load_image(image_file, processor) for image_file in images[start:start + batch_size]]
+        # Full frames and tiles of the whole chunk share one forward pass
+        views = [_model_views(image, edge) for image in chunk]
+        batch_results = _run_views(processor, model, [view for image_views in views for view in image_views])
+        merged = []
+        position = 0
+        for image_views in views:
+            merged.append(merge_detections(batch_results[position:position + len(image_views)]))
+            position += len(image_views)
+        if ROI_MODE == "on":
+            with metrics.timer("detect_stage_seconds", stage="roi"):
+                merged = _roi_pass(chunk, merged, processor, model)
+        second_stage = get_second_stage()
+        if second_stage is not None:
+            with metrics.timer("detect_stage_seconds", stage="cascade"):
+                merged = _cascade(chunk, merged, model.config.id2label, *second_stage)
+        with metrics.timer("detect_stage_seconds", stage="classify"):
+            detections.extend(_classify_detections(results, model.config.id2label) for results in merged)
+        tiled = [len(image_views) - 1 for image_views in views if len(image_views) > 1]
+        if tiled:
+            metrics.incr("tiled_images", len(tiled))
+            for tiles in tiled:
+                metrics.observe("tiles_per_image", tiles)
+        metrics.incr("images_processed", len(chunk), model=model_registry.backend("detector"))
+        metrics.observe("detect_batch_size", len(chunk))
+    for detected in detections:
+        metrics.observe("detections_per_image", len(detected))
+    return detections
+
+def _run_views(processor, model, views, timed=True):
+    """Detections for (pixels, target, offset, scale) views in one forward pass, in original coordinates"""
+    def stage(name):
+        return metrics.timer("detect_stage_seconds", stage=name) if timed else contextlib.nullcontext()
+
+    with stage("preprocess"):
+        # The processor pads and stacks the views into a single pixel_values tensor
+        inputs = _match_dtype(processor(images=[view[0] for view in views], return_tensors="pt"), model)
+    with stage("forward"):
+        with torch.inference_mode():
+            outputs = model(**inputs)
+    with stage("postprocess"):
+        # Boxes come out normalized, so scaling to the original size undoes the reduced decode
+        batch_results = processor.post_process_object_detection(
+            outputs,
+            target_sizes=torch.tensor([view[1] for view in views]),
+            threshold=DETECTION_THRESHOLD
+        )
+        # Crops and tiles come out in their own pixels: shift into the decoded frame, then scale
+        for (_, _, (x0, y0), (sx, sy)), results in zip(views, batch_results):
+            if x0 or y0 or sx != 1.0 or sy != 1.0:
+                offset = results["boxes"].new_tensor([x0, y0, x0, y0])
+                results["boxes"] = (results["boxes"] + offset) * results["boxes"].new_tensor([sx, sy, sx, sy])
+    return batch_results
+
+def _person_crops(image, results, table):
+    """Views of the decoded frame around the most confident people, at most ROI_MAX_PERSONS"""
+    labels, scores = results["labels"], results["scores"]
+    known = labels < len(table.names)
+    safe_labels = torch.where(known, labels, torch.zeros_like(labels))
+    people = torch.nonzero(known & table.person[safe_labels] & (scores >= ROI_PERSON_THRESHOLD)).flatten()
+    people = people[scores[people].argsort(descending=True)][:ROI_MAX_PERSONS]
+    sx, sy = image.scale
+    width, height = image.size
+    crops = []
+    for x0, y0, x1, y1 in results["boxes"][people].tolist():
+        # Original coordinates back to decoded pixels, widened by the margin on every side
+        margin_x, margin_y = (x1 - x0) * ROI_MARGIN / sx, (y1 - y0) * ROI_MARGIN / sy
+        left, top = max(0, int(x0 / sx - margin_x)), max(0, int(y0 / sy - margin_y))
+        right, bottom = min(width, int(x1 / sx + margin_x) + 1), min(height, int(y1 / sy + margin_y) + 1)
+        if min(right - left, bottom - top) < ROI_MIN_SIZE:
+            continue
+        # Basic slicing keeps the crop a view of the decoded frame
+        crops.append((image.array[top:bottom, left:right], (bottom - top, right - left), (left, top), image.scale))
+    return crops
+
+def _roi_pass(chunk, merged, processor, model):
+    """Search person regions for hand-held objects and merge the weapon-like finds"""
+    table = get_label_table(model.config.id2label)
+    crops = [_person_crops(image, results, table) for image, results in zip(chunk, merged)]
+    flat_crops = [crop for image_crops in crops for crop in image_crops]
+    if not flat_crops:
+        return merged
+    metrics.incr("roi_crops", len(flat_crops))
+    crop_results = _run_views(processor, model, flat_crops, timed=False)
+    position = 0
+    updated = []
+    for results, image_crops in zip(merged, crops):
+        metrics.observe("roi_crops_per_image", len(image_crops))
+        found = [results]
+        for crop in crop_results[position:position + len(image_crops)]:
+            # Only objects that can raise a threat; people inside the crop are already known
+            labels = crop["labels"]
+            known = labels < len(table.names)
+            keep = known & table.threat[torch.where(known, labels, torch.zeros_like(labels))]
+            found.append({key: value[keep] for key, value in crop.items()})
+        position += len(image_crops)
+        updated.append(merge_detections(found))
+    return updated
+
+def _match_dtype(inputs, model):
+    """Cast pixel values to the weights' dtype, for models kept in bfloat16"""
+    dtype = getattr(model, "dtype", torch.float32)
+    if dtype != torch.float32 and "pixel_values" in inputs:
+        inputs["pixel_values"] = inputs["pixel_values"].to(dtype)
+    return inputs
+
+def _cascade(chunk, screened, id2label, processor, model):
+    """Re-run the ambiguous images of a chunk through the second-stage model and merge its boxes"""
+    table = get_label_table(id2label)
+    escalate = [i for i, results in enumerate(screened) if _is_ambiguous(results, table)]
+    cascade_stats["screened"] += len(chunk)
+    cascade_stats["escalated"] += len(escalate)
+    metrics.incr("cascade_images", len(chunk), stage="screen")
+    if not escalate:
+        return screened
+    metrics.incr("cascade_images", len(escalate), stage="escalate")
+    # DETR gets the full frames only; its larger input covers what tiles add for YOLOS
+    inputs = _match_dtype(processor(images=[chunk[i].array for i in escalate], return_tensors="pt"), model)
+    with torch.inference_mode():
+        outputs = model(**inputs)
+    second = processor.post_process_object_detection(
+        outputs,
+        target_sizes=torch.tensor([chunk[i].original_size[::-1] for i in escalate]),
+        threshold=DETECTION_THRESHOLD
+    )
+    translate = _label_translation(model.config.id2label, id2label)
+    merged = list(screened)
+    for i, results in zip(escalate, second):
+        if translate is not None:
+            labels = translate[results["labels"].clamp(max=len(translate) - 1)]
+            known = (labels >= 0) & (results["labels"] < len(translate))
+            results = {"scores": results["scores"][known], "labels": labels[known], "boxes": results["boxes"][known]}
+        merged[i] = merge_detections([screened[i], results])
+    return merged
+
+def _is_ambiguous(results, table):
+    """Whether a screened image needs the second stage"""
+    labels, scores = results["labels"], results["scores"]
+    if not len(labels):
+        return False
+    known = labels < len(table.names)
+    safe_labels = torch.where(known, labels, torch.zeros_like(labels))
+    low, high = CASCADE_BAND
+    uncertain = known & table.threat[safe_labels] & (scores >= low) & (scores < high)
+    return bool((uncertain | (known & table.ambiguous[safe_labels])).any())
+
+_LABEL_TRANSLATIONS = {}
+
+def _label_translation(source, target):
+    """Tensor mapping source label ids to target ids by name (-1 when absent), or None if identical"""
+    if source == target:
+        return None
+    key = (id(source), id(target))
+    if key not in _LABEL_TRANSLATIONS:
+        by_name = {name.lower(): label_id for label_id, name in target.items()}
+        translate = torch.full((max(source, default=-1) + 1,), -1, dtype=torch.long)
+        for label_id, name in source.items():
+            translate[label_id] = by_name.get(name.lower(), -1)
+        _LABEL_TRANSLATIONS[key] = (source, target, translate)
+    return _LABEL_TRANSLATIONS[key][2]
+
+# Label tables are built once per id2label mapping and reused for every image
+_LABEL_TABLES = {}
+
+class LabelTable:
+    """Per-label lookups derived from id2label, WEAPON_CLASSES and SEVERITY_MAP
+
+    Each label has an ordered list of tiers (min_confidence, weapon); a detection
+    takes the weapon of the first tier whose threshold its score exceeds.
+    """
+
+    def __init__(self, id2label):
+        size = max(id2label, default=-1) + 1
+        self.names = [id2label.get(i, f"unknown_{i}").lower() for i in range(size)]
+        rules = [_label_rules(label_id, name) for label_id, name in enumerate(self.names)]
+        self.tiers = max((len(r) for r in rules), default=0)
+        self.thresholds = torch.full((self.tiers, size), float("inf"))
+        self.weapons = [[None] * size for _ in range(self.tiers)]
+        self.gun_like = torch.zeros(size, dtype=torch.bool)
+        # Cascade and ROI masks: labels that can raise a threat, and labels often confused
+        # with weapons. Both go by label name, since class ids differ between label sets
+        self.threat = torch.zeros(size, dtype=torch.bool)
+        self.ambiguous = torch.zeros(size, dtype=torch.bool)
+        self.person = torch.tensor([name == "person" for name in self.names], dtype=torch.bool)
+        for label_id, label_rules in enumerate(rules):
+            for tier, (min_confidence, weapon_name) in enumerate(label_rules):
+                self.thresholds[tier, label_id] = min_confidence
+                self.weapons[tier][label_id] = weapon_name
+            name = self.names[label_id]
+            self.gun_like[label_id] = any(x in name for x in GUN_KEYWORDS) or name in GUN_LIKE_LABELS
+            self.threat[label_id] = bool(self.gun_like[label_id]) or (
+                SEVERITY_MAP.get(WEAPON_MATCHER.first(name), "LOW") != "LOW"
+            )
+            self.ambiguous[label_id] = name in AMBIGUOUS_LABELS
+
+    def label_name(self, label_id):
+        return self.names[label_id] if label_id < len(self.names) else f"unknown_{label_id}"
+
+def get_label_table(id2label):
+    cached = _LABEL_TABLES.get(id(id2label))
+    if cached is None or cached[0] is not id2label:
+        cached = (id2label, LabelTable(id2label))
+        _LABEL_TABLES[id(id2label)] = cached
+    return cached[1]
+
+def _label_rules(label_id, label_name):
+    """Ordered (min_confidence, weapon) rules for one label; -1 means unconditional"""
+    # Check by class ID
+    if label_id in WEAPON_CLASSES:
+        return [(-1.0, WEAPON_CLASSES[label_id])]
+
+    # Check by label name with keyword matching
+    keyword = WEAPON_MATCHER.first(label_name)
+    if keyword:
+        return [(-1.0, keyword)]
+
+    # Special handling for common misclassifications, then context-based detection
+    rules = []
+    if label_id == 77:  # teddy bear - often misclassified guns
+        return rules + [(-1.0, "handgun")]
+    if "bear" in label_name:
+        rules.append((0.4, "handgun"))  # High confidence teddy bear might be gun
+    if "bottle" in label_name:
+        rules.append((0.5, "bottle"))
+    if "knife" in label_name or "blade" in label_name:
+        return rules + [(-1.0, "knife")]
+    if "scissor" in label_name:
+        return rules + [(-1.0, "scissors")]
+    if "bat" in label_name:
+        return rules + [(-1.0, "baseball bat")]
+    if label_name in ["person", "man", "woman"]:
+        # Person detection might indicate threat context
+        rules.append((0.6, "person"))
+    if any(obj in label_name for obj in ["stick", "pipe", "rod"]):
+        rules.append((0.4, "sharp object"))
+    return rules
+
+def _classify_detections(results, id2label):
+    """Turn post-processed detections of one image into weapon detection dicts"""
+    table = get_label_table(id2label)
+    scores, labels = results["scores"], results["labels"]
+    label_ids = labels.tolist()
+    confidences = scores.tolist()
+    boxes = results["boxes"].tolist()
+
+    # Debug output, only formatted when debug logging is enabled
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Raw detections: %s", ", ".join(
+            f"{table.label_name(label_id)} (ID: {label_id}) {confidence:.2f}"
+            for label_id, confidence in zip(label_ids, confidences)
+        ))
+
+    # Pick the first tier each detection qualifies for, as masks over the whole result
+    known = labels < len(table.names)
+    safe_labels = torch.where(known, labels, torch.zeros_like(labels))
+    tier_choice = torch.full_like(labels, -1)
+    for tier in range(table.tiers):
+        hit = known & (tier_choice < 0) & (scores > table.thresholds[tier][safe_labels])
+        tier_choice[hit] = tier
 
     detected = []
-    for score, label, box in zip(results["scores"], results["labels"], results["boxes"]):
-        label_id = label.item()
-        label_name = model.config.id2label.get(label_id, f"unknown_{label_id}").lower()
-        confidence = float(score.item())
-        
-        # Enhanced weapon detection logic
-        weapon_name = None
-        severity = "LOW"
-        
-        # Check by class ID
-        if label_id in WEAPON_CLASSES:
-            weapon_name = WEAPON_CLASSES[label_id]
-        
-        # Check by label name with keyword matching
-        if not weapon_name:
-            for keyword in WEAPON_KEYWORDS:
-                if keyword in label_name:
-                    weapon_name = keyword
-                    break
-        
-        # Special handling for common misclassifications
-        if not weapon_name:
-            if label_id == 77:  # teddy bear - often misclassified guns
-                weapon_name = "handgun"
-            elif "bear" in label_name and confidence > 0.4:
-                weapon_name = "handgun"  # High confidence teddy bear might be gun
-            elif "bottle" in label_name and confidence > 0.5:
-                weapon_name = "bottle"
-            elif "knife" in label_name or "blade" in label_name:
-                weapon_name = "knife"
-            elif "scissor" in label_name:
-                weapon_name = "scissors"
-            elif "bat" in label_name:
-                weapon_name = "baseball bat"
-        
-        # Additional context-based detection
-        if not weapon_name:
-            # Check for threatening objects based on shape and context
-            if label_name in ["person", "man", "woman"] and confidence > 0.6:
-                # Person detection might indicate threat context
-                weapon_name = "person"
-            elif any(obj in label_name for obj in ["stick", "pipe", "rod"]) and confidence > 0.4:
-                weapon_name = "sharp object"
-        
-        if weapon_name:
-            severity = SEVERITY_MAP.get(weapon_name, "LOW")
-            detected.append({
-                "weapon": weapon_name,
-                "severity": severity,
-                "confidence": confidence,
-                "bbox": [round(c, 2) for c in box.tolist()],
-                "original_label": label_name
-            })
-    
+    tier_choice = tier_choice.tolist()
+    for index, tier in enumerate(tier_choice):
+        if tier < 0:
+            continue
+        label_id = label_ids[index]
+        weapon_name = table.weapons[tier][label_id]
+        detected.append({
+            "weapon": weapon_name,
+            "severity": SEVERITY_MAP.get(weapon_name, "LOW"),
+            "confidence": confidences[index],
+            "bbox": [round(c, 2) for c in boxes[index]],
+            "original_label": table.names[label_id]
+        })
+
     # Additional heuristic: if we detect multiple objects, check for weapon-like combinations
-    if len(detected) == 0 and len(results["scores"]) > 0:
+    if len(detected) == 0 and len(label_ids) > 0:
         # Check for suspicious object combinations
-        detected_labels = [model.config.id2label.get(label.item(), "").lower() for label in results["labels"]]
+        detected_labels = {table.label_name(label_id) for label_id in label_ids}
         if "person" in detected_labels and any(obj in detected_labels for obj in ["bottle", "stick", "pipe"]):
             detected.append({
                 "weapon": "suspicious object",
@@ -228,42 +588,40 @@ def detect_weapons(image_file):
                 "bbox": [0, 0, 100, 100],
                 "original_label": "person with object"
             })
-    
-    print(f"\n=== Filtered Weapons ===")
-    for item in detected:
-        print(f"- {item['weapon']} ({item['severity']}) conf: {item['confidence']:.2f}")
 
     # --- Enhancement: Post-process for gun-like objects ---
-    gun_keywords = ["gun", "pistol", "rifle", "firearm"]
-    gun_like_labels = ["baseball bat", "tennis racket"]
-    for score, label, box in zip(results["scores"], results["labels"], results["boxes"]):
-        label_name = model.config.id2label.get(label.item(), f"unknown_{label.item()}").lower()
-        confidence = float(score.item())
-        # Debug print for all detected labels
-        print(f"[DEBUG] Detected label: {label_name}, confidence: {confidence:.2f}")
-        if any(x in label_name for x in gun_keywords) or label_name in gun_like_labels:
-            # Only add if not already detected as a weapon
-            if not any(d['original_label'] == label_name for d in detected):
-                detected.append({
-                    "weapon": "gun",
-                    "severity": "SERIOUS-URGENT",
-                    "confidence": confidence,
-                    "bbox": [round(c, 2) for c in box.tolist()],
-                    "original_label": label_name
-                })
-
-    # --- Workaround: If no objects detected, check image description for gun/weapon keywords ---
-    import streamlit as st
-    if len(detected) == 0:
-        # Try to get the image description from Streamlit session state
-        image_description = st.session_state.get('image_description', '')
-        if any(x in image_description.lower() for x in gun_keywords):
+    already_detected = {d['original_label'] for d in detected}
+    gun_like = known & table.gun_like[safe_labels]
+    for index in torch.nonzero(gun_like).flatten().tolist():
+        label_name = table.names[label_ids[index]]
+        # Only add if not already detected as a weapon
+        if label_name not in already_detected:
+            already_detected.add(label_name)
             detected.append({
+                "weapon": "gun",
+                "severity": "SERIOUS-URGENT",
+                "confidence": confidences[index],
+                "bbox": [round(c, 2) for c in boxes[index]],
+                "original_label": label_name
+            })
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Filtered weapons: %s", ", ".join(
+            f"{item['weapon']} ({item['severity']}) {item['confidence']:.2f}" for item in detected
+        ))
+
+    return detected
+
+def apply_description_fallback(detected, image_description=""):
+    """Workaround: If no objects detected, check image description for gun/weapon keywords"""
+    if len(detected) == 0 and image_description:
+        if GUN_MATCHER.search(image_description):
+            metrics.incr("fallback_activations", kind="description")
+            return [{
                 "weapon": "gun (from description)",
                 "severity": "SERIOUS-URGENT",
                 "confidence": 1.0,
                 "bbox": [],
                 "original_label": "description"
-            })
-
-    return detected
\ No newline at end of file
+            }]
+    return detected
@@ -0,0 +1,75 @@
+# ==========================================
+# 📄 pages/1_Analytics.py
+# ==========================================
+"""
+Trend dashboard over the report archive. Charts read the hourly rollups;
+the incident table reads only the partitions its date and threat filters select.
+"""
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+# Streamlit puts the main app's directory on sys.path for every page
+from report_archive import compact, load_reports, load_rollup
+from report_store import ReportStore
+
+THREAT_LEVELS = ["SERIOUS-URGENT", "SERIOUS", "MEDIUM", "LOW"]
+
+st.set_page_config(page_title="AI Crime Reporter - Analytics", layout="wide")
+st.title("📊 Threat Analytics")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def rollup(kind, since, county, ward):
+    return load_rollup(kind, since=since, county=county, ward=ward)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def recent_reports(since, threat_levels, county, ward):
+    return load_reports(
+        since=since, threat_levels=threat_levels, county=county, ward=ward, limit=200,
+        columns=["timestamp", "county", "ward", "location", "weapons", "max_confidence", "report_id"]
+    )
+
+with st.sidebar:
+    days = st.slider("Days", 1, 90, 7)
+    county = st.text_input("County")
+    ward = st.text_input("Ward")
+    if st.button("🔄 Update archive"):
+        with st.spinner("Compacting new reports..."):
+            archived = compact(ReportStore())
+        st.cache_data.clear()
+        st.success(f"Archived {archived} new report(s)")
+
+# Whole hours, so the cache key only changes once an hour
+since = (datetime.now() - timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
+reports = rollup("reports", since, county, ward)
+weapons = rollup("weapons", since, county, ward)
+
+if reports.empty:
+    st.info("No archived reports for this period. Run `python report_archive.py compact` or update the archive.")
+    st.stop()
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Reports", int(reports["reports"].sum()))
+col2.metric("Serious or urgent", int(reports[reports["threat_level"].isin(THREAT_LEVELS[:2])]["reports"].sum()))
+col3.metric("Weapon detections", int(weapons["detections"].sum()) if not weapons.empty else 0)
+
+st.subheader("Threat levels per hour")
+per_hour = reports.pivot_table(index="hour", columns="threat_level", values="reports", aggfunc="sum", fill_value=0)
+st.bar_chart(per_hour[[level for level in THREAT_LEVELS if level in per_hour.columns]])
+
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader("Detections by weapon")
+    if not weapons.empty:
+        st.bar_chart(weapons.groupby("weapon")["detections"].sum().sort_values(ascending=False))
+with col2:
+    st.subheader("Reports by ward")
+    by_ward = reports.assign(ward=reports["ward"].replace("", "unknown")).pivot_table(
+        index="ward", columns="threat_level", values="reports", aggfunc="sum", fill_value=0
+    )
+    st.dataframe(by_ward, use_container_width=True)
+
+st.subheader("Recent serious incidents")
+# Location filters go into the dataset scan, so the 200 newest are the newest in that ward
+incidents = recent_reports(since, tuple(THREAT_LEVELS[:2]), county, ward)
+st.dataframe(incidents, use_container_width=True, hide_index=True)
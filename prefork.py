@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# ==========================================
+# 📄 services/prefork.py
+# ==========================================
+"""
+Preforking inference server. The parent loads every model once, switches them
+to inference-only (eval, no gradients, optionally bfloat16) and freezes the
+garbage collector, then forks workers that serve the same listening socket.
+Weight pages stay shared copy-on-write, so an extra worker costs its private
+working memory rather than another copy of the models.
+
+Per-process memory comes from /proc/<pid>/smaps_rollup: PSS splits shared
+pages between the processes that map them, so the sum of worker PSS is the
+real footprint and each worker's private memory is what one more would add.
+
+Usage:
+    python prefork.py --listen 127.0.0.1:8765 --workers 4
+    python prefork.py --listen unix:/tmp/weapon-detector.sock --workers 8 --bf16
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import torch
+
+import metrics
+import model_registry
+from inference_backends import backend_of, text_backend
+
+logger = logging.getLogger(__name__)
+
+MEMORY_FIELDS = {"Rss": "rss", "Pss": "pss", "Private_Clean": "private", "Private_Dirty": "private",
+                 "Shared_Clean": "shared", "Shared_Dirty": "shared"}
+
+def memory_usage(pid="self"):
+    """{"rss", "pss", "shared", "private"} in bytes for a process, or {} where smaps_rollup is unavailable"""
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                field, _, value = line.partition(":")
+                if field in MEMORY_FIELDS:
+                    kind = MEMORY_FIELDS[field]
+                    usage[kind] = usage.get(kind, 0) + int(value.split()[0]) * 1024
+    except OSError:
+        return {}
+    return usage
+
+def _modules(obj):
+    """torch modules held by a registry entry: a module, a (processor, model) pair or a pipeline"""
+    if isinstance(obj, torch.nn.Module):
+        yield obj
+    elif isinstance(obj, (tuple, list)):
+        for item in obj:
+            yield from _modules(item)
+    elif hasattr(obj, "model"):
+        yield from _modules(obj.model)
+
+def prepare_models(bf16=False):
+    """Load every registered model and make it inference-only; returns {name: backend}"""
+    loaded = model_registry.warmup()
+    for name in loaded:
+        if not model_registry.is_loaded(name):
+            continue
+        # Quantized and traced backends keep their own dtypes
+        entry = model_registry.get(name)
+        eager = (text_backend() if name in ("sentiment", "violence") else backend_of(entry[1])) == "eager"
+        for module in _modules(entry):
+            module.eval()
+            module.requires_grad_(False)
+            if bf16 and eager:
+                module.to(torch.bfloat16)
+    # Objects created so far are never collected; the collector no longer
+    # touches their headers, which would dirty the shared pages in every worker
+    gc.collect()
+    gc.freeze()
+    return loaded
+
+def _listening_socket(listen):
+    if listen.startswith("unix:"):
+        path = listen[5:]
+        if os.path.exists(path):
+            os.unlink(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+    else:
+        host, _, port = listen.rpartition(":")
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host or "127.0.0.1", int(port)))
+    sock.listen(1024)
+    sock.setblocking(False)
+    return sock
+
+async def _serve_worker(sock, args):
+    from inference_server import InferenceServer
+    server = InferenceServer(max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000,
+                             max_queue=args.max_queue)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, stopping.set)
+    await server.start(sock=sock)
+    try:
+        await stopping.wait()
+    finally:
+        await server.stop()
+
+def _run_worker(index, sock, args):
+    """Body of a forked worker; never returns"""
+    status = 0
+    try:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles Ctrl-C
+        torch.set_num_threads(args.threads_per_worker)
+        metrics.register_collector(lambda: [
+            ("worker_memory_bytes", {"kind": kind}, value) for kind, value in memory_usage().items()
+        ])
+        if args.metrics_port:
+            metrics.serve_prometheus(args.metrics_port + index)
+        asyncio.run(_serve_worker(sock, args))
+    except Exception:
+        logger.exception("Worker %d failed", index)
+        status = 1
+    finally:
+        os._exit(status)
+
+def _fork_worker(index, sock, args):
+    pid = os.fork()
+    if pid == 0:
+        _run_worker(index, sock, args)
+    return pid
+
+def log_memory(workers):
+    """Log RSS / PSS / private memory of the parent and every worker"""
+    for label, pid in [("parent", os.getpid())] + [(f"worker {i}", pid) for i, pid in workers.items()]:
+        usage = memory_usage(pid)
+        if usage:
+            logger.info("%s (pid %d): rss %.0f MB, pss %.0f MB, private %.0f MB", label, pid,
+                        usage["rss"] / 2**20, usage["pss"] / 2**20, usage.get("private", 0) / 2**20)
+
+def main():
+    parser = argparse.ArgumentParser(description="Preforking weapon detection inference server")
+    parser.add_argument("--listen", default=os.environ.get("INFERENCE_SERVER", "127.0.0.1:8765"),
+                        help="host:port or unix:/path/to.sock")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--bf16", action="store_true", help="keep eager model weights in bfloat16")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--metrics-port", type=int, help="worker i serves Prometheus metrics on this port + i")
+    parser.add_argument("--memory-report-interval", type=float, default=300.0,
+                        help="seconds between memory log lines (0 logs once at startup)")
+    args = parser.parse_args()
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+
+    # Nothing may run inference before the fork: OpenMP thread pools do not survive it
+    loaded = prepare_models(args.bf16)
+    logger.info("Models loaded in parent: %s", loaded)
+    sock = _listening_socket(args.listen)
+    workers = {i: _fork_worker(i, sock, args) for i in range(args.workers)}
+    logger.info("Serving %s with %d workers", args.listen, args.workers)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    time.sleep(1.0)
+    log_memory(workers)
+    next_report = time.monotonic() + args.memory_report_interval
+    while not stopping:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            index = next((i for i, worker_pid in workers.items() if worker_pid == pid), None)
+            if index is not None:
+                logger.warning("Worker %d (pid %d) exited with status %d, restarting", index, pid, status)
+                workers[index] = _fork_worker(index, sock, args)
+            continue
+        if args.memory_report_interval and time.monotonic() >= next_report:
+            log_memory(workers)
+            next_report = time.monotonic() + args.memory_report_interval
+        time.sleep(0.5)
+
+    for pid in workers.values():
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers.values():
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# ==========================================
+# 📄 storage/report_archive.py
+# ==========================================
+"""
+Columnar archive of incident reports for dashboards. A compaction job copies
+reports that are new since its last run from the report store into Parquet
+files partitioned by date and threat level, and folds them into small
+hourly rollups (reports per threat level and location, detections per weapon
+type). Dashboards read the rollups and, for drill-downs, only the partitions
+their filters select.
+
+Each output keeps its own cursor (the last report revision it contains), so
+an interrupted run is picked up without double counting. A report updated in
+the store gets a new revision: its archived row is replaced and its old counts
+are taken out of the rollups before the new ones are added.
+
+Usage:
+    python report_archive.py compact --import reports data/reports
+    python report_archive.py summary --days 7
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from report_store import ReportStore, _location_fields
+
+ARCHIVE_DIR = os.environ.get("REPORT_ARCHIVE_DIR", os.path.join("data", "archive"))
+
+# Partitions holding more files than this are merged into one after a run
+MAX_FILES_PER_PARTITION = 8
+
+LOCATION_KEYS = ["county", "ward", "location"]
+ROLLUPS = {
+    "reports": ["hour", "threat_level"] + LOCATION_KEYS,
+    "weapons": ["hour", "threat_level", "weapon"] + LOCATION_KEYS,
+}
+
+# Columns stored in the partition files; date and threat_level live in the directory names
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("revision", pa.int64()),
+    ("report_id", pa.string()),
+    ("timestamp", pa.timestamp("us")),
+    ("county", pa.string()),
+    ("sub_county", pa.string()),
+    ("ward", pa.string()),
+    ("location", pa.string()),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("weapons", pa.list_(pa.string())),
+    ("max_confidence", pa.float64()),
+    ("duplicate_of", pa.string()),
+    ("payload", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string()), ("threat_level", pa.string())]), flavor="hive")
+
+_PART_NAME = re.compile(r"part-(\d+)-(\d+)-\d+\.parquet$")
+
+logger = logging.getLogger(__name__)
+
+PARTS_SCHEMA = ARCHIVE_SCHEMA.append(pa.field("date", pa.string())).append(pa.field("threat_level", pa.string()))
+
+def _paths(archive_dir):
+    return os.path.join(archive_dir, "reports"), {
+        kind: os.path.join(archive_dir, f"rollup_{kind}.parquet") for kind in ROLLUPS
+    }
+
+def _flatten(revision, row_id, report):
+    place = _location_fields(report.get("location"))
+    weapons = [w for w in report.get("weapons_detected") or [] if isinstance(w, dict)]
+    return {
+        "id": row_id,
+        "revision": revision,
+        "report_id": report.get("report_id"),
+        "timestamp": report.get("timestamp"),
+        "threat_level": report.get("threat_level") or report.get("alert_level") or "UNKNOWN",
+        "county": place.get("county", ""),
+        "sub_county": place.get("sub_county", ""),
+        "ward": place.get("ward", ""),
+        "location": place.get("location", ""),
+        "latitude": place.get("latitude"),
+        "longitude": place.get("longitude"),
+        "weapons": [str(w.get("weapon")) for w in weapons],
+        "max_confidence": max((float(w.get("confidence") or 0) for w in weapons), default=None),
+        "duplicate_of": report.get("duplicate_of"),
+        "payload": json.dumps(report),
+    }
+
+def _frame(rows):
+    frame = pd.DataFrame([_flatten(*row) for row in rows])
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], errors="coerce", format="ISO8601")
+    invalid = frame["timestamp"].isna()
+    if invalid.any():
+        logger.warning("Skipping %d report(s) without a valid timestamp", int(invalid.sum()))
+        frame = frame[~invalid]
+    frame["hour"] = frame["timestamp"].dt.floor("h")
+    frame["date"] = frame["timestamp"].dt.strftime("%Y-%m-%d")
+    return frame
+
+def _aggregate(frame, kind):
+    if kind == "reports":
+        grouped = frame.groupby(ROLLUPS[kind], dropna=False).size().rename("reports")
+    else:
+        exploded = frame[["id"] + ROLLUPS["reports"] + ["weapons"]].explode("weapons").dropna(subset=["weapons"])
+        exploded = exploded.rename(columns={"weapons": "weapon"})
+        grouped = exploded.groupby(ROLLUPS[kind], dropna=False).agg(
+            detections=("id", "size"), reports=("id", "nunique")
+        )
+    return grouped.reset_index()
+
+def _rollup_cursor(path):
+    if not os.path.exists(path):
+        return 0
+    metadata = pq.read_schema(path).metadata or {}
+    return int(metadata.get(b"last_revision", b"0"))
+
+def _update_rollup(path, kind, frame, previous, last_revision):
+    """Add frame's counts to the rollup at path, less those of the rows' previous versions, atomically"""
+    counts = _aggregate(frame, kind)
+    if len(previous):
+        removed = _aggregate(previous, kind)
+        value_columns = removed.columns.difference(ROLLUPS[kind])
+        removed[value_columns] = -removed[value_columns]
+        counts = pd.concat([counts, removed], ignore_index=True)
+    if os.path.exists(path):
+        counts = pd.concat([pq.read_table(path).to_pandas(), counts], ignore_index=True)
+    counts = counts.groupby(ROLLUPS[kind], dropna=False).sum(numeric_only=True).reset_index()
+    counts = counts[counts["reports"] != 0]
+    table = pa.Table.from_pandas(counts, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), b"last_revision": str(last_revision).encode()}
+    )
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+def _parts_cursor(parts_dir):
+    last_revisions = [
+        int(match.group(2))
+        for match in map(_PART_NAME.search, glob.glob(os.path.join(parts_dir, "**", "*.parquet"), recursive=True))
+        if match
+    ]
+    return max(last_revisions, default=0)
+
+def _dataset(parts_dir):
+    return ds.dataset(parts_dir, format="parquet", partitioning=PARTITIONING, schema=PARTS_SCHEMA)
+
+def _archived(parts_dir, ids):
+    """Archived rows for these report ids, with the file holding each as "file" """
+    if not os.path.isdir(parts_dir):
+        return pd.DataFrame(columns=PARTS_SCHEMA.names + ["file"])
+    table = _dataset(parts_dir).to_table(
+        columns=PARTS_SCHEMA.names + ["__filename"], filter=ds.field("id").isin([int(i) for i in ids])
+    )
+    previous = table.to_pandas().rename(columns={"__filename": "file"})
+    previous["hour"] = previous["timestamp"].dt.floor("h")
+    return previous
+
+def _drop_rows(files, ids):
+    """Rewrite part files without the rows of these report ids
+
+    Files keep their names, even when emptied, so the parts cursor stays put.
+    """
+    ids = pa.array([int(i) for i in ids], pa.int64())
+    for path in files:
+        table = pq.read_table(path, partitioning=None, schema=ARCHIVE_SCHEMA)
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table.filter(pc.invert(pc.is_in(table["id"], value_set=ids))), tmp_path)
+        os.replace(tmp_path, path)
+
+def _write_parts(parts_dir, frame):
+    """Append frame to the date / threat level partitions; returns the partition directories touched"""
+    table = pa.Table.from_pandas(frame[PARTS_SCHEMA.names], schema=PARTS_SCHEMA, preserve_index=False)
+    first, last = int(frame["revision"].min()), int(frame["revision"].max())
+    pq.write_to_dataset(
+        table, parts_dir, partitioning=PARTITIONING,
+        basename_template=f"part-{first:012d}-{last:012d}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore"
+    )
+    return {
+        os.path.join(parts_dir, f"date={date}", f"threat_level={level}")
+        for date, level in frame[["date", "threat_level"]].drop_duplicates().itertuples(index=False)
+    }
+
+def _merge_small_files(partition_dir):
+    """Rewrite a partition with many small files as a single file"""
+    files = sorted(glob.glob(os.path.join(partition_dir, "part-*.parquet")))
+    if len(files) <= MAX_FILES_PER_PARTITION:
+        return
+    ranges = [tuple(map(int, _PART_NAME.search(f).groups())) for f in files]
+    merged_path = os.path.join(
+        partition_dir, f"part-{min(r[0] for r in ranges):012d}-{max(r[1] for r in ranges):012d}-0.parquet"
+    )
+    table = pa.concat_tables([pq.read_table(f, partitioning=None, schema=ARCHIVE_SCHEMA) for f in files])
+    tmp_path = f"{merged_path}.tmp"
+    pq.write_table(table, tmp_path)
+    # The merged file is in place before any source goes, so a crash never loses rows
+    os.replace(tmp_path, merged_path)
+    for f in files:
+        if f != merged_path:
+            os.remove(f)
+
+def compact(store=None, archive_dir=ARCHIVE_DIR, batch_size=50_000):
+    """Archive and roll up every report added or changed since the last run; returns how many"""
+    store = store or ReportStore()
+    parts_dir, rollup_paths = _paths(archive_dir)
+    os.makedirs(parts_dir, exist_ok=True)
+    cursors = {"parts": _parts_cursor(parts_dir)}
+    cursors.update({kind: _rollup_cursor(path) for kind, path in rollup_paths.items()})
+    touched = set()
+    archived = 0
+    for rows in store.iter_changes(min(cursors.values()), batch_size):
+        last_revision = rows[-1][0]
+        frame = _frame(rows)
+        # Versions of these reports archived by earlier runs; the parts are updated last,
+        # so they still hold what the rollups counted
+        previous = _archived(parts_dir, frame["id"])
+        for kind, path in rollup_paths.items():
+            if cursors[kind] < last_revision:
+                changed = frame[frame["revision"] > cursors[kind]]
+                _update_rollup(path, kind, changed, previous[previous["id"].isin(changed["id"])], last_revision)
+        if cursors["parts"] < last_revision:
+            changed = frame[frame["revision"] > cursors["parts"]]
+            replaced = previous[previous["id"].isin(changed["id"])]
+            if len(replaced):
+                _drop_rows(set(replaced["file"]), replaced["id"])
+            if len(changed):
+                touched |= _write_parts(parts_dir, changed)
+            archived += len(changed)
+        cursors = dict.fromkeys(cursors, last_revision)
+    for partition_dir in touched:
+        _merge_small_files(partition_dir)
+    return archived
+
+def load_rollup(kind, since=None, until=None, archive_dir=ARCHIVE_DIR, **equals):
+    """Rollup rows ("reports" or "weapons") for an hour range and exact column filters, e.g. ward="Kilimani" """
+    path = _paths(archive_dir)[1][kind]
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=ROLLUPS[kind] + (["reports"] if kind == "reports" else ["detections", "reports"]))
+    filters = [(column, "==", value) for column, value in equals.items() if value]
+    if since is not None:
+        filters.append(("hour", ">=", pd.Timestamp(since)))
+    if until is not None:
+        filters.append(("hour", "<", pd.Timestamp(until)))
+    return pq.read_table(path, filters=filters or None).to_pandas()
+
+def load_reports(since=None, until=None, threat_levels=None, columns=None, archive_dir=ARCHIVE_DIR, limit=None,
+                 **equals):
+    """Archived reports, reading only the date and threat level partitions that match
+
+    equals are exact column filters (e.g. ward="Kilimani"), applied before limit.
+    """
+    parts_dir = _paths(archive_dir)[0]
+    if not os.path.isdir(parts_dir):
+        return pd.DataFrame(columns=columns)
+    dataset = _dataset(parts_dir)
+    condition = None
+
+    def both(expression):
+        return expression if condition is None else condition & expression
+
+    if since is not None:
+        since = pd.Timestamp(since)
+        condition = both((ds.field("date") >= since.strftime("%Y-%m-%d")) & (ds.field("timestamp") >= since))
+    if until is not None:
+        until = pd.Timestamp(until)
+        condition = both((ds.field("date") <= until.strftime("%Y-%m-%d")) & (ds.field("timestamp") < until))
+    if threat_levels:
+        condition = both(ds.field("threat_level").isin(list(threat_levels)))
+    for column, value in equals.items():
+        if value:
+            condition = both(ds.field(column) == value)
+    table = dataset.to_table(columns=columns, filter=condition)
+    frame = table.to_pandas()
+    if "timestamp" in frame.columns:
+        frame = frame.sort_values("timestamp", ascending=False)
+    return frame.head(limit) if limit else frame
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar report archive and rollups")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact_parser = sub.add_parser("compact", help="archive and roll up new reports")
+    compact_parser.add_argument("--import", dest="import_paths", nargs="*", default=[],
+                                help="first import legacy report JSON files or directories")
+    summary_parser = sub.add_parser("summary", help="print report counts per day and threat level")
+    summary_parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+
+    if args.command == "compact":
+        store = ReportStore()
+        if args.import_paths:
+            print(f"Imported {store.import_json_files(args.import_paths)} legacy reports")
+        print(f"Archived {compact(store, args.archive_dir)} reports into {args.archive_dir}")
+        store.close()
+    else:
+        rollup = load_rollup("reports", since=datetime.now() - timedelta(days=args.days), archive_dir=args.archive_dir)
+        if rollup.empty:
+            print("No archived reports")
+            return
+        rollup["day"] = rollup["hour"].dt.date
+        print(rollup.pivot_table(index="day", columns="threat_level", values="reports", aggfunc="sum", fill_value=0))
+
+if __name__ == "__main__":
+    main()
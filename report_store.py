@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# ==========================================
+# 📄 storage/report_store.py
+# ==========================================
+"""
+Indexed report store backed by SQLite in WAL mode. Reports are queued from
+the UI thread and written in batches by a background writer; timestamp,
+threat level and location are indexed so queries never scan every report.
+A report submitted again with the same report_id (e.g. on a Streamlit rerun)
+replaces the stored row instead of adding another. Every insert or update
+gives the row the next revision number, so readers can follow changes.
+
+Usage:
+    python report_store.py import reports data/reports data/reports.json
+    python report_store.py query --threat-level SERIOUS-URGENT --since-hours 1 --ward Kilimani
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from admin_areas import resolve_locations
+
+DEFAULT_DB_PATH = os.environ.get("REPORT_DB", os.path.join("data", "reports.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    threat_level TEXT,
+    county TEXT,
+    sub_county TEXT,
+    ward TEXT,
+    location TEXT,
+    latitude REAL,
+    longitude REAL,
+    source TEXT UNIQUE,
+    payload TEXT NOT NULL,
+    report_id TEXT UNIQUE,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_reports_timestamp ON reports(timestamp);
+CREATE INDEX IF NOT EXISTS idx_reports_threat_timestamp ON reports(threat_level, timestamp);
+CREATE INDEX IF NOT EXISTS idx_reports_ward_timestamp ON reports(ward, timestamp);
+CREATE INDEX IF NOT EXISTS idx_reports_county_timestamp ON reports(county, timestamp);
+CREATE INDEX IF NOT EXISTS idx_reports_location ON reports(location);
+CREATE INDEX IF NOT EXISTS idx_reports_revision ON reports(revision);
+"""
+
+# Sources are imported once; a known report_id is updated in place and keeps its row id.
+# Write transactions start IMMEDIATE, so MAX(revision) + 1 is never handed out twice
+_INSERT = """
+INSERT INTO reports
+    (timestamp, threat_level, county, sub_county, ward, location, latitude, longitude, source, payload, report_id,
+     revision)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(revision), 0) + 1 FROM reports))
+ON CONFLICT(source) DO NOTHING
+ON CONFLICT(report_id) DO UPDATE SET
+    timestamp = excluded.timestamp,
+    threat_level = excluded.threat_level,
+    county = excluded.county,
+    sub_county = excluded.sub_county,
+    ward = excluded.ward,
+    location = excluded.location,
+    latitude = excluded.latitude,
+    longitude = excluded.longitude,
+    source = COALESCE(excluded.source, reports.source),
+    payload = excluded.payload,
+    revision = excluded.revision
+"""
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+class ReportStore:
+    """SQLite report store with a background batch writer"""
+
+    def __init__(self, path=DEFAULT_DB_PATH, batch_size=256, flush_interval=0.2):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level="IMMEDIATE")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # --- Writes ---
+    def submit(self, report, source=None, payload=None):
+        """Queue a report for the background writer; returns immediately
+
+        payload is the report's JSON when the caller has already serialized it.
+        """
+        self._ensure_writer()
+        self._queue.put((report, source, payload))
+
+    def write(self, reports, sources=None):
+        """Synchronously insert or update reports in one transaction; returns the number of rows written"""
+        rows = [_row(report, source) for report, source in zip(reports, sources or [None] * len(reports))]
+        conn = self._reader()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(_INSERT, rows)
+            return conn.total_changes - before
+
+    def flush(self):
+        """Block until every submitted report has been written"""
+        self._queue.join()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="report-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # Gather whatever else arrives shortly after, up to batch_size
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+                except queue.Empty:
+                    break
+            stopping = any(item is _STOP for item in batch)
+            rows = [_row(*item) for item in batch if item is not _STOP]
+            try:
+                with conn:
+                    conn.executemany(_INSERT, rows)
+            except sqlite3.Error as exc:
+                logger.error("Failed to write %d report(s): %s", len(rows), exc)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+    # --- Queries ---
+    def query(self, threat_level=None, since=None, until=None, county=None, ward=None, location=None, limit=100):
+        """Reports matching every given filter, newest first
+
+        since/until accept datetimes, ISO strings or a timedelta meaning "that long ago".
+        """
+        where, params = _filters(threat_level, since, until, county, ward, location)
+        sql = f"SELECT id, payload FROM reports {where} ORDER BY timestamp DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        reports = []
+        for row_id, payload in self._reader().execute(sql, params):
+            report = json.loads(payload)
+            report.setdefault("id", row_id)
+            reports.append(report)
+        return reports
+
+    def count(self, threat_level=None, since=None, until=None, county=None, ward=None, location=None):
+        where, params = _filters(threat_level, since, until, county, ward, location)
+        return self._reader().execute(f"SELECT COUNT(*) FROM reports {where}", params).fetchone()[0]
+
+    def iter_changes(self, after_revision=0, batch_size=5000):
+        """Yield lists of (revision, id, report) in revision order for rows written after after_revision"""
+        conn = self._reader()
+        while True:
+            rows = conn.execute(
+                "SELECT revision, id, payload FROM reports WHERE revision > ? ORDER BY revision LIMIT ?",
+                (after_revision, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            yield [(revision, row_id, json.loads(payload)) for revision, row_id, payload in rows]
+            after_revision = rows[-1][0]
+
+    # --- Legacy import ---
+    def import_json_files(self, paths):
+        """Import report JSON files (or directories of them); already imported files are skipped"""
+        reports, sources = [], []
+        for path in _expand(paths):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as exc:
+                logger.warning("Skipping %s: %s", path, exc)
+                continue
+            for i, report in enumerate(data if isinstance(data, list) else [data]):
+                report = dict(report)
+                report.setdefault("timestamp", _timestamp_from_path(path))
+                reports.append(report)
+                sources.append(f"{os.path.abspath(path)}#{i}")
+        # Reports with coordinates but no county/ward get them from the offline boundaries
+        resolve_locations([r["location"] for r in reports if isinstance(r.get("location"), dict)])
+        return self.write(reports, sources)
+
+def _row(report, source=None, payload=None):
+    place = _location_fields(report.get("location"))
+    timestamp = report.get("timestamp") or datetime.now().isoformat()
+    return (
+        timestamp,
+        report.get("threat_level") or report.get("alert_level"),
+        place.get("county"),
+        place.get("sub_county"),
+        place.get("ward"),
+        place.get("location"),
+        place.get("latitude"),
+        place.get("longitude"),
+        source,
+        payload or json.dumps(report),
+        report.get("report_id")
+    )
+
+def _location_fields(location):
+    """Normalize the location shapes used by geolocator and the older reports"""
+    if not isinstance(location, dict):
+        return {}
+    fields = {}
+    manual = location.get("manual") or {}
+    for key in ("county", "sub_county", "ward", "location"):
+        value = manual.get(key) or location.get(key)
+        if value and isinstance(value, str):
+            fields[key] = value
+    if "location" not in fields and location.get("address"):
+        fields["location"] = location["address"]
+    auto = location.get("auto")
+    if auto and len(auto) == 2:
+        fields["latitude"], fields["longitude"] = auto
+    elif "latitude" in location and "longitude" in location:
+        fields["latitude"], fields["longitude"] = location["latitude"], location["longitude"]
+    return fields
+
+def _filters(threat_level, since, until, county, ward, location):
+    clauses, params = [], []
+    for column, value in (("threat_level", threat_level), ("county", county), ("ward", ward), ("location", location)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        clauses.append("timestamp >= ?")
+        params.append(_as_timestamp(since))
+    if until is not None:
+        clauses.append("timestamp < ?")
+        params.append(_as_timestamp(until))
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def _as_timestamp(value):
+    if isinstance(value, timedelta):
+        value = datetime.now() - value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _expand(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, "*.json")))
+        else:
+            yield from sorted(glob.glob(path)) or [path]
+
+def _timestamp_from_path(path):
+    """Reports saved by app.py are named <YYYYmmdd_HHMMSS>.json"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    try:
+        return datetime.strptime(stem, "%Y%m%d_%H%M%S").isoformat()
+    except ValueError:
+        return datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
+
+def main():
+    parser = argparse.ArgumentParser(description="Report store maintenance")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="import legacy JSON reports")
+    import_parser.add_argument("paths", nargs="+")
+    query_parser = commands.add_parser("query", help="query stored reports")
+    query_parser.add_argument("--threat-level")
+    query_parser.add_argument("--since-hours", type=float)
+    query_parser.add_argument("--county")
+    query_parser.add_argument("--ward")
+    query_parser.add_argument("--location")
+    query_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    store = ReportStore(args.db)
+    if args.command == "import":
+        print(f"Imported {store.import_json_files(args.paths)} report(s) into {args.db}")
+    else:
+        since = timedelta(hours=args.since_hours) if args.since_hours else None
+        for report in store.query(args.threat_level, since, None, args.county, args.ward, args.location, args.limit):
+            print(json.dumps(report))
+    store.close()
+
+if __name__ == "__main__":
+    main()
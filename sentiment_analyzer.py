@@ -1,17 +1,24 @@
 # ==========================================
 # 📄 analyzers/sentiment_analyzer.py
 # ==========================================
-from transformers import pipeline
-import re
 
-# Initialize multiple classifiers for better threat detection
-try:
-    classifier = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-    violence_classifier = pipeline("text-classification", model="unitary/toxic-bert")
-    print("Using enhanced sentiment analysis with violence detection")
-except:
-    classifier = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-    print("Using basic sentiment analysis")
+import metrics
+import model_registry
+from keyword_matcher import KeywordMatcher
+
+def get_classifier():
+    """Sentiment classifier, or None if it cannot be loaded"""
+    try:
+        return model_registry.get("sentiment")
+    except Exception:
+        return None
+
+def get_violence_classifier():
+    """Violence classifier, or None when only basic sentiment analysis is available"""
+    try:
+        return model_registry.get("violence")
+    except Exception:
+        return None
 
 # Violence-related keywords
 VIOLENCE_KEYWORDS = [
@@ -21,12 +28,63 @@ VIOLENCE_KEYWORDS = [
     "bomb", "explosive", "threaten", "assault", "robbery", "crime"
 ]
 
+# Whole-word matcher over all violence keywords, built once at import
+VIOLENCE_MATCHER = KeywordMatcher(VIOLENCE_KEYWORDS)
+
 def analyze_threat_level(weapons, image_description=""):
     """Enhanced threat level analysis with violence detection"""
-    if not weapons and not image_description:
-        return "LOW"
-    
-    # Combine weapon information and image description
+    return analyze_threat_level_batch([(weapons, image_description)])[0]
+
+def analyze_threat_level_batch(items, batch_size=16):
+    """Threat levels for (weapons, image_description) pairs, batching the classifier calls
+
+    The transformer classifiers only run for texts whose level the rule-based
+    signals (weapon severities and violence keywords) leave undecided.
+    """
+    items = [(weapons or [], image_description) for weapons, image_description in items]
+    levels = [None] * len(items)
+    threat_texts = {}
+    violence_scores = {}
+    for i, (weapons, image_description) in enumerate(items):
+        if not weapons and not image_description:
+            levels[i] = "LOW"
+            continue
+        threat_texts[i] = _threat_text(weapons, image_description)
+        # Check for violence keywords, one point per distinct keyword
+        violence_scores[i] = len(VIOLENCE_MATCHER.counts(threat_texts[i]))
+
+    # The violence classifier adds at most 1 point, so skip it where that cannot change the level
+    pending = [
+        i for i in threat_texts
+        if _rule_threat_level(items[i][0], violence_scores[i]) != _rule_threat_level(items[i][0], violence_scores[i] + 1)
+    ]
+    metrics.incr("classifier_skipped", len(threat_texts) - len(pending), model="violence")
+    if pending:
+        with metrics.timer("text_classifier_seconds", model="violence"):
+            results = _classify(get_violence_classifier(), [threat_texts[i] for i in pending], batch_size)
+        for i, violence_result in zip(pending, results):
+            if violence_result and violence_result['label'] == 'toxic':
+                violence_scores[i] += violence_result['score']
+
+    # Sentiment only decides between MEDIUM and LOW once no rule has fired
+    pending = []
+    for i in threat_texts:
+        levels[i] = _rule_threat_level(items[i][0], violence_scores[i])
+        if levels[i] is None:
+            pending.append(i)
+    metrics.incr("classifier_skipped", len(threat_texts) - len(pending), model="sentiment")
+    if pending:
+        with metrics.timer("text_classifier_seconds", model="sentiment"):
+            results = _classify(get_classifier(), [threat_texts[i] for i in pending], batch_size)
+        for i, sentiment_result in zip(pending, results):
+            if sentiment_result and sentiment_result['label'] == 'NEGATIVE' and sentiment_result['score'] > 0.7:
+                levels[i] = "MEDIUM"
+            else:
+                levels[i] = "LOW"
+    return levels
+
+def _threat_text(weapons, image_description):
+    """Combine weapon information and image description"""
     threat_text = ""
     if weapons:
         weapon_names = [w.get('weapon', '') for w in weapons]
@@ -35,37 +93,30 @@ def analyze_threat_level(weapons, image_description=""):
     
     if image_description:
         threat_text += f"Image context: {image_description}"
-    
-    # Check for violence keywords
-    violence_score = 0
-    for keyword in VIOLENCE_KEYWORDS:
-        if keyword.lower() in threat_text.lower():
-            violence_score += 1
-    
-    # Analyze sentiment
-    try:
-        sentiment_result = classifier(threat_text[:512])[0]  # Limit text length
-        sentiment_score = sentiment_result['score']
-        sentiment_label = sentiment_result['label']
-        
-        # Violence detection
-        violence_result = violence_classifier(threat_text[:512])[0]
-        violence_score += violence_result['score'] if violence_result['label'] == 'toxic' else 0
-    except:
-        sentiment_score = 0.5
-        sentiment_label = 'NEUTRAL'
-    
-    # Determine threat level based on multiple factors
+    return threat_text
+
+def _rule_threat_level(weapons, violence_score):
+    """Threat level from weapon severities and violence score, or None if sentiment decides"""
     if violence_score > 2 or any(w.get('severity') == 'SERIOUS-URGENT' for w in weapons):
         return "SERIOUS-URGENT"
     elif violence_score > 1 or any(w.get('severity') == 'SERIOUS' for w in weapons):
         return "SERIOUS"
     elif any(w.get('severity') == 'MEDIUM' for w in weapons):
         return "MEDIUM"
-    elif sentiment_label == 'NEGATIVE' and sentiment_score > 0.7:
-        return "MEDIUM"
-    else:
-        return "LOW"
+    return None
+
+def _classify(pipe, texts, batch_size):
+    """Run a text classification pipeline over texts in one batched call
+
+    Texts are truncated by the tokenizer to the model's own maximum length.
+    Returns one result per text, or None for every text if the classifier is unavailable.
+    """
+    if pipe is None:
+        return [None] * len(texts)
+    try:
+        return pipe(texts, batch_size=batch_size, truncation=True)
+    except Exception:
+        return [None] * len(texts)
 
 def analyze_image_context(image_description):
     """Analyze image context for violent content"""
@@ -73,10 +124,7 @@ def analyze_image_context(image_description):
         return "LOW"
     
     # Check for violence indicators in description
-    violence_indicators = 0
-    for keyword in VIOLENCE_KEYWORDS:
-        if keyword.lower() in image_description.lower():
-            violence_indicators += 1
+    violence_indicators = len(VIOLENCE_MATCHER.counts(image_description))
     
     if violence_indicators >= 2:
         return "SERIOUS"
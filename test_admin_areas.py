@@ -0,0 +1,46 @@
+import json
+import random
+
+import admin_areas
+from admin_areas import AdminAreaIndex
+
+def _square(x0, y0, size):
+    return [[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size], [x0, y0]]
+
+def _feature(properties, *rings):
+    return {"type": "Feature", "properties": properties, "geometry": {"type": "Polygon", "coordinates": list(rings)}}
+
+def _write(tmp_path, features):
+    path = tmp_path / "boundaries.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+    return str(path)
+
+def test_lookup_merges_levels_and_respects_holes(tmp_path):
+    path = _write(tmp_path, [
+        _feature({"COUNTY": "Nairobi"}, _square(36.0, -2.0, 1.0)),
+        _feature({"county": "Nairobi", "sub_county": "Westlands", "ward": "Kilimani"},
+                 _square(36.0, -2.0, 0.5), _square(36.1, -1.9, 0.1)),
+    ])
+    index = AdminAreaIndex.from_geojson(path)
+    assert index.lookup(-1.8, 36.3) == {"county": "Nairobi", "sub_county": "Westlands", "ward": "Kilimani"}
+    assert index.lookup(-1.2, 36.8) == {"county": "Nairobi"}
+    assert index.lookup(-1.85, 36.15) == {"county": "Nairobi"}  # inside the hole
+    assert index.lookup(0.0, 0.0) == {}
+
+def test_tree_matches_brute_force(tmp_path):
+    features = [_feature({"ward": f"w{i}-{j}"}, _square(i, j, 1.0)) for i in range(30) for j in range(30)]
+    index = AdminAreaIndex.from_geojson(_write(tmp_path, features))
+    rng = random.Random(0)
+    points = [(rng.uniform(0.01, 29.99), rng.uniform(0.01, 29.99)) for _ in range(200)]
+    for (lat, lng), fields in zip(points, index.lookup_many(points)):
+        assert fields == {"ward": f"w{int(lng)}-{int(lat)}"}
+
+def test_resolve_locations_fills_missing_fields(tmp_path, monkeypatch):
+    path = _write(tmp_path, [_feature({"county": "Nairobi", "ward": "Kilimani"}, _square(36.0, -2.0, 1.0))])
+    monkeypatch.setattr(admin_areas, "_index", AdminAreaIndex.from_geojson(path))
+    monkeypatch.setattr(admin_areas, "_index_loaded", True)
+    app_location = {"auto": [-1.5, 36.5], "manual": {"county": "", "ward": "Typed"}}
+    flat = {"latitude": -1.5, "longitude": 36.5}
+    assert admin_areas.resolve_locations([app_location, flat, {"address": "x"}]) == 2
+    assert app_location["manual"] == {"county": "Nairobi", "ward": "Typed"}
+    assert flat["ward"] == "Kilimani"
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+Tests for batched multi-image detection
+"""
+
+import pytest
+
+from object_detector import detect_weapons_batch
+
+def test_description_count_must_match_image_count():
+    with pytest.raises(ValueError):
+        detect_weapons_batch([object(), object()], image_descriptions=["a gun"])
@@ -0,0 +1,66 @@
+from camera_scheduler import Camera, CameraScheduler, TokenBucket
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_token_bucket_caps_rate():
+    clock = Clock()
+    bucket = TokenBucket(2.0, burst=2, clock=clock)
+    assert bucket.take(5) == 2
+    assert bucket.take(1) == 0
+    assert bucket.wait_time() == 0.5
+    clock.now = 1.0
+    assert bucket.take(5) == 2
+
+def test_interval_adapts_to_threats():
+    clock = Clock()
+    camera = Camera("gate", "gate", min_interval=0.5, max_interval=16.0, half_life=10.0, replay=True, clock=clock)
+    assert camera.interval() == 16.0
+    camera.record([{"weapon": "knife"}], "SERIOUS")
+    assert camera.interval() == 0.5
+    clock.now = 10.0
+    assert abs(camera.interval() - 16.0 * (0.5 / 16.0) ** 0.5) < 1e-9
+    camera.record([], "LOW")
+    clock.now = 1000.0
+    assert camera.interval() > 15.9
+
+def test_budget_goes_to_hot_cameras_first():
+    clock = Clock()
+    cameras = [Camera(f"cam{i}", f"cam{i}", replay=True, clock=clock) for i in range(4)]
+    for camera in cameras:
+        camera.read_frame = lambda camera=camera: camera.name
+    cameras[2].heat = 1.0
+    seen = []
+
+    def process(frames):
+        seen.append(list(frames))
+        return [([], "LOW")] * len(frames)
+
+    scheduler = CameraScheduler(cameras, budget=2.0, process_batch=process, clock=clock)
+    for second in range(3):
+        clock.now = float(second)
+        assert scheduler.step() == 2
+    # The hot camera is sampled every round; the quiet ones share the rest of the budget
+    assert [batch[0] for batch in seen] == ["cam2"] * 3
+    assert sorted(batch[1] for batch in seen) == ["cam0", "cam1", "cam3"]
+
+def test_failed_frame_does_not_stop_other_cameras():
+    clock = Clock()
+    cameras = [Camera(f"cam{i}", f"cam{i}", min_interval=0.5, replay=True, clock=clock) for i in range(3)]
+    for camera in cameras:
+        camera.read_frame = lambda camera=camera: camera.name
+
+    def process(frames):
+        if "cam1" in frames:
+            raise OSError("image file is truncated")
+        return [([], "LOW")] * len(frames)
+
+    scheduler = CameraScheduler(cameras, budget=3.0, process_batch=process, clock=clock)
+    assert scheduler.step() == 3
+    assert [camera.frames for camera in cameras] == [1, 0, 1]
+    # The failed camera is retried soon, not after a full interval
+    assert cameras[1].next_due == 0.5 and cameras[0].next_due > 0.5
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the YOLOS-then-DETR cascade: which images escalate and how DETR labels are merged
+"""
+
+import numpy as np
+import torch
+
+import object_detector
+from benchmarks import tiny_models
+from image_decode import decode_image
+from object_detector import LabelTable, _cascade, _is_ambiguous, _label_translation
+
+COCO = dict(enumerate(tiny_models.COCO_LABELS))
+
+def _results(labels, scores):
+    return {
+        "labels": torch.tensor(labels, dtype=torch.long),
+        "scores": torch.tensor(scores),
+        "boxes": torch.tensor([[10.0, 10, 50, 50]] * len(labels)).reshape(-1, 4),
+    }
+
+def test_label_translation_by_name():
+    assert _label_translation(COCO, COCO) is None
+    translate = _label_translation({0: "person", 1: "Knife", 2: "zebra"}, {1: "person", 49: "knife"})
+    assert translate.tolist() == [1, 49, -1]
+
+def test_only_uncertain_threats_and_ambiguous_labels_escalate():
+    table = LabelTable(COCO)
+    # Threat labels go by name: COCO id 49 is "knife", id 77 "cell phone"
+    assert _is_ambiguous(_results([49], [0.5]), table)  # uncertain knife, inside the confidence band
+    assert not _is_ambiguous(_results([49], [0.9]), table)  # confident
+    assert not _is_ambiguous(_results([77], [0.5]), table)  # uncertain, but not a threat label
+    assert _is_ambiguous(_results([44], [0.95]), table)  # bottle, often confused with weapons
+    assert not _is_ambiguous(_results([1, 62], [0.5, 0.5]), table)  # person and chair
+    assert not _is_ambiguous(_results([], []), table)
+
+def test_cascade_merges_translated_second_stage_boxes(monkeypatch):
+    monkeypatch.setattr(object_detector, "DETECTION_THRESHOLD", 0.0)
+    monkeypatch.setattr(object_detector, "cascade_stats", {"screened": 0, "escalated": 0})
+    torch.manual_seed(0)
+    processor, model = tiny_models.tiny_detr()
+    # Screening labels differ from DETR's COCO ids, so DETR boxes are translated by name
+    id2label = {0: "person", 1: "bottle", 2: "cell phone"}
+    chunk = [decode_image(np.zeros((240, 320, 3), dtype=np.uint8)) for _ in range(2)]
+    screened = [_results([1], [0.9]), _results([0], [0.9])]
+    merged = _cascade(chunk, screened, id2label, processor, model)
+
+    assert object_detector.cascade_stats == {"screened": 2, "escalated": 1}
+    assert merged[1] is screened[1]
+    # The untrained DETR only predicts "cell phone" (its id 77), which becomes 2 here
+    assert set(merged[0]["labels"].tolist()) == {1, 2}
+    assert 0.9 in [round(score, 4) for score in merged[0]["scores"].tolist()]
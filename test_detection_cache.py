@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed detection cache
+"""
+
+from detection_cache import DetectionCache
+
+WEAPONS = [{"weapon": "knife", "severity": "SERIOUS", "confidence": 0.9, "bbox": [1, 2, 3, 4]}]
+
+def test_key_depends_on_bytes_model_and_threshold():
+    key = DetectionCache.key(b"image", "hustvl/yolos-tiny+eager", 0.1)
+    assert "/" not in key
+    assert key == DetectionCache.key(b"image", "hustvl/yolos-tiny+eager", 0.1)
+    assert key != DetectionCache.key(b"other", "hustvl/yolos-tiny+eager", 0.1)
+    assert key != DetectionCache.key(b"image", "hustvl/yolos-tiny+onnx", 0.1)
+    assert key != DetectionCache.key(b"image", "hustvl/yolos-tiny+eager", 0.2)
+
+def test_lru_bound_and_counters():
+    cache = DetectionCache(max_entries=2)
+    cache.put("a", WEAPONS)
+    cache.put("b", [])
+    assert cache.get("a") == WEAPONS  # a is now the most recent
+    cache.put("c", [])
+    assert cache.get("b") is None
+    assert cache.get("a") == WEAPONS and cache.get("c") == []
+    assert cache.stats() == {"hits": 3, "disk_hits": 0, "misses": 1, "size": 2, "max_entries": 2}
+
+def test_entries_are_copies():
+    cache = DetectionCache()
+    detected = [dict(WEAPONS[0])]
+    cache.put("a", detected)
+    detected[0]["weapon"] = "changed"
+    cache.get("a")[0]["weapon"] = "changed again"
+    assert cache.get("a") == WEAPONS
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    cache = DetectionCache(cache_dir=str(tmp_path))
+    cache.put("a", WEAPONS)
+    assert [p.name for p in tmp_path.iterdir()] == ["a.json"]
+
+    fresh = DetectionCache(max_entries=1, cache_dir=str(tmp_path))
+    assert fresh.get("a") == WEAPONS
+    assert fresh.get("a") == WEAPONS  # promoted to memory
+    assert fresh.get("missing") is None
+    assert (fresh.hits, fresh.disk_hits, fresh.misses) == (1, 1, 1)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for memory-bounded decoding and mapping boxes back to the original size
+"""
+
+import io
+
+import numpy as np
+import torch
+from PIL import Image
+
+import object_detector
+from benchmarks import tiny_models
+from image_decode import ImageTooLarge, decode_image
+
+def _encoded(width, height, fmt):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(buffer, fmt)
+    return buffer.getvalue()
+
+def test_jpeg_is_decoded_in_draft_mode():
+    image = decode_image(_encoded(4000, 3000, "JPEG"), 512, 1333)
+    # 1/4 is the smallest DCT scale that still covers a 512 pixel shortest edge
+    assert image.size == (1000, 750) and image.original_size == (4000, 3000)
+    assert image.scale == (4.0, 4.0)
+    assert image.array.flags["C_CONTIGUOUS"] and image.array.shape == (750, 1000, 3)
+
+def test_other_formats_are_reduced_after_loading():
+    image = decode_image(_encoded(2000, 1500, "PNG"), 512, 1333)
+    assert image.size == (1000, 750) and image.scale == (2.0, 2.0)
+    assert decode_image(_encoded(640, 480, "PNG"), 512, 1333).size == (640, 480)
+
+def test_arrays_are_only_reduced_well_above_the_model_size():
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    assert decode_image(frame, 512, 1333).size == (960, 540)
+    assert decode_image(frame[:600, :800], 512, 1333).size == (800, 600)
+
+def test_limits_are_checked_before_decoding():
+    data = _encoded(1000, 1000, "PNG")
+    for kwargs in ({"max_pixels": 999_999}, {"max_bytes": len(data) - 1}):
+        try:
+            decode_image(data, 512, 1333, **kwargs)
+        except ImageTooLarge:
+            pass
+        else:
+            raise AssertionError(f"{kwargs} should be enforced")
+
+def test_boxes_map_back_to_original_coordinates(monkeypatch):
+    monkeypatch.setattr(object_detector, "DETECTION_THRESHOLD", 0.0)
+    processor, model = tiny_models.tiny_yolos()
+    image = decode_image(_encoded(2048, 1536, "JPEG"), 512, 1333)
+    assert image.scale == (2.0, 2.0)
+    # The full frame is post-processed straight to the original size; a view of
+    # the same pixels goes through the offset/scale path and must land in the same place
+    full = (image.array, image.original_size[::-1], (0, 0), (1.0, 1.0))
+    view = (image.array[:, :], image.size[::-1], (0, 0), image.scale)
+    direct, mapped = object_detector._run_views(processor, model, [full, view], timed=False)
+    assert len(direct["boxes"]) > 0
+    assert torch.allclose(direct["boxes"], mapped["boxes"], atol=1e-2)
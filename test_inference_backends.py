@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Tests for the detector backends and their eager fallback
+"""
+
+from benchmarks import tiny_models
+from inference_backends import backend_of, optimize_detector
+
+def test_backend_actually_used_is_exposed():
+    _, model = tiny_models.tiny_yolos()
+    assert backend_of(optimize_detector(model, "eager")) == "eager"
+    assert backend_of(optimize_detector(model, "int8")) == "int8"
+
+def test_failed_backend_reports_eager():
+    _, model = tiny_models.tiny_yolos()
+    fallback = optimize_detector(model, "tensorrt")
+    assert fallback is model and backend_of(fallback) == "eager"
+
+def test_onnx_pads_inputs_to_shared_shapes(tmp_path):
+    import os
+
+    import torch
+
+    from inference_backends import OnnxDetector
+    _, model = tiny_models.tiny_yolos()
+    detector = OnnxDetector(model, cache_dir=str(tmp_path), max_files=1, bucket=64)
+    aligned = torch.rand(2, 3, 128, 192)
+    with torch.inference_mode():
+        expected = model(pixel_values=aligned)
+    outputs = detector(aligned)
+    assert torch.allclose(outputs.logits, expected.logits, atol=1e-4)
+    assert torch.allclose(outputs.pred_boxes, expected.pred_boxes, atol=1e-4)
+    # A smaller image inside the same bucket reuses the graph
+    detector(torch.rand(2, 3, 120, 170))
+    assert len(detector._graphs) == 1
+    # Three images run as a batch of four, cut back afterwards; the disk keeps only max_files graphs
+    outputs = detector(torch.rand(3, 3, 120, 170))
+    assert outputs.logits.shape[0] == 3 and len(detector._graphs) == 2
+    assert len(os.listdir(tmp_path)) == 1
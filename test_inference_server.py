@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for the micro-batching inference service, using stand-in models
+"""
+
+import asyncio
+import threading
+
+from inference_client import InferenceClient, InferenceError
+from inference_server import InferenceServer, MicroBatcher, Overloaded
+
+def fake_detect(items):
+    return [[{"weapon": "knife", "severity": "SERIOUS-URGENT", "bytes": len(image)}] for image, _ in items]
+
+def fake_analyze(items):
+    return [{"threat_level": "SERIOUS-URGENT" if weapons else "LOW", "context_threat": "LOW"} for weapons, _ in items]
+
+def test_requests_are_micro_batched():
+    async def run():
+        seen = []
+        def process(items):
+            seen.append(len(items))
+            return [item * 2 for item in items]
+        batcher = MicroBatcher(process, max_batch_size=4, max_wait=0.05)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        await batcher.stop()
+        return results, seen, batcher.stats()
+
+    results, seen, stats = asyncio.run(run())
+    assert results == [i * 2 for i in range(10)]
+    assert seen == [4, 4, 2]
+    assert stats["queue_depth"] == 0 and stats["p99_ms"] >= stats["p50_ms"]
+
+def test_failed_items_do_not_fail_their_batch():
+    async def run():
+        def process(items):
+            if any(item < 0 for item in items):
+                raise ValueError("not an image")
+            return [item * 2 for item in items]
+        batcher = MicroBatcher(process, max_batch_size=4, max_wait=0.05)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.submit(i) for i in (1, -1, 3)), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    first, bad, third = asyncio.run(run())
+    assert (first, third) == (2, 6)
+    assert isinstance(bad, ValueError)
+
+def test_full_queue_applies_backpressure():
+    async def run():
+        release = threading.Event()
+        def slow(items):
+            release.wait()
+            return items
+        batcher = MicroBatcher(slow, max_batch_size=1, max_wait=0, max_queue=1)
+        batcher.start()
+        first = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0.05)  # first item is now being processed
+        second = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        try:
+            await batcher.submit(3)
+        except Overloaded:
+            rejected = True
+        else:
+            rejected = False
+        release.set()
+        await asyncio.gather(first, second)
+        await batcher.stop()
+        return rejected, batcher.rejected
+
+    assert asyncio.run(run()) == (True, 1)
+
+def test_non_object_requests_are_rejected():
+    server = InferenceServer(fake_detect, fake_analyze)
+    for request in ([1, 2], "detect", None):
+        response = asyncio.run(server.handle_request(request))
+        assert response == {"ok": False, "error": "request must be a JSON object"}
+
+def test_client_round_trip(tmp_path):
+    address = f"unix:{tmp_path / 'inference.sock'}"
+    ready = threading.Event()
+    loop = asyncio.new_event_loop()
+    server = InferenceServer(fake_detect, fake_analyze, max_wait=0.001)
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start(address))
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    ready.wait(5)
+    try:
+        client = InferenceClient(address, timeout=5)
+        weapons = client.detect(b"12345", "")
+        assert weapons == [{"weapon": "knife", "severity": "SERIOUS-URGENT", "bytes": 5}]
+        assert client.analyze(weapons, "") == ("SERIOUS-URGENT", "LOW")
+        assert client.stats()["detect"]["queue_depth"] == 0
+        try:
+            client._call({"op": "nope"})
+        except InferenceError:
+            pass
+        else:
+            raise AssertionError("unknown op should fail")
+    finally:
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
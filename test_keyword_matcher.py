@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-pass keyword matcher
+"""
+
+from keyword_matcher import KeywordMatcher
+
+def test_whole_words_only():
+    matcher = KeywordMatcher(["attack", "gun"])
+    assert matcher.counts("Gunther waved a handgun") == {}
+    assert matcher.counts("An attack, then another ATTACK with guns") == {"attack": 2, "gun": 1}
+
+def test_inflections_count():
+    matcher = KeywordMatcher(["attack", "shoot", "threaten", "gun", "knife"])
+    assert matcher.counts("they were attacking and shooting") == {"attack": 1, "shoot": 1}
+    assert matcher.counts("attackers threatened him, he was gunned down") == {"attack": 1, "threaten": 1, "gun": 1}
+    assert matcher.counts("knifing, knifed, knives") == {"knife": 2}
+
+def test_substring_mode():
+    matcher = KeywordMatcher(["gun", "rifle"], whole_words=False)
+    for text in ("held at gunpoint", "a gunman entered", "gunshots heard", "GUNFIRE outside", "riflescope"):
+        assert matcher.search(text), text
+    assert not matcher.search("a quiet street")
+
+def test_multi_word_keywords_imply_contained_keywords():
+    matcher = KeywordMatcher(["gun", "machine gun", "baseball bat", "bat"])
+    assert matcher.counts("a machine  gun and a baseball bat") == {
+        "machine gun": 1, "gun": 1, "baseball bat": 1, "bat": 1
+    }
+
+def test_first_follows_keyword_order():
+    matcher = KeywordMatcher(["knife", "gun", "baseball bat", "bat"])
+    assert matcher.first("baseball bat") == "baseball bat"
+    assert matcher.first("gun and knife") == "knife"
+    assert matcher.first("teddy bear") is None
+    assert matcher.search("a GUN") and not matcher.search("")
+
+if __name__ == "__main__":
+    test_whole_words_only()
+    test_inflections_count()
+    test_substring_mode()
+    test_multi_word_keywords_imply_contained_keywords()
+    test_first_follows_keyword_order()
+    print("✅ Keyword matcher tests passed")
+
+def test_empty_keyword_list_matches_nothing():
+    matcher = KeywordMatcher([])
+    assert matcher.counts("a gun and a knife") == {}
+    assert matcher.first("a gun") is None
+    assert not matcher.search("a gun")
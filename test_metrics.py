@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process metrics and their Prometheus export
+"""
+
+import logging
+
+import metrics
+
+def test_collector_gauges_are_exported():
+    collect = lambda: [("queue_depth", {"op": "detect"}, 3), ("cache_hits", {}, 7)]
+    metrics.register_collector(collect)
+    try:
+        text = metrics.render_prometheus()
+    finally:
+        metrics._collectors.remove(collect)
+    assert "# TYPE queue_depth gauge" in text
+    assert 'queue_depth{op="detect"} 3' in text.splitlines()
+    assert "cache_hits 7" in text.splitlines()
+
+def test_failing_collector_is_logged_and_skipped(caplog):
+    def broken():
+        raise RuntimeError("collector bug")
+    good = lambda: [("model_loaded", {"model": "detector"}, 1)]
+    metrics.register_collector(broken)
+    metrics.register_collector(good)
+    try:
+        with caplog.at_level(logging.ERROR, logger="metrics"):
+            text = metrics.render_prometheus()
+    finally:
+        metrics._collectors.remove(broken)
+        metrics._collectors.remove(good)
+    assert 'model_loaded{model="detector"} 1' in text.splitlines()
+    assert "collector bug" in caplog.text
+
+def test_counters_and_timings():
+    metrics.reset()
+    metrics.incr("frames", camera="gate")
+    metrics.incr("frames", 2, camera="gate")
+    metrics.observe("detect_seconds", 0.5)
+    lines = metrics.render_prometheus().splitlines()
+    assert 'frames_total{camera="gate"} 3.0' in lines
+    assert "detect_seconds_count 1" in lines and "detect_seconds_sum 0.5" in lines
+    metrics.reset()
@@ -0,0 +1,30 @@
+import pytest
+
+import model_registry
+
+def test_failed_load_is_retried_after_the_backoff(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(model_registry.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(model_registry, "LOAD_RETRY_SECONDS", 30)
+    attempts = []
+
+    def loader():
+        attempts.append(now[0])
+        if len(attempts) == 1:
+            raise OSError("hub unreachable")
+        return "model"
+
+    model_registry.register("flaky", "remote", loader)
+    try:
+        with pytest.raises(RuntimeError):
+            model_registry.get("flaky")
+        now[0] = 10
+        # Within the backoff the cached error is raised without calling the loader
+        with pytest.raises(RuntimeError):
+            model_registry.get("flaky")
+        now[0] = 31
+        assert model_registry.get("flaky") == "model"
+        assert attempts == [0, 31] and model_registry.backend("flaky") == "remote"
+    finally:
+        model_registry.reset(["flaky"])
+        model_registry._LOADERS.pop("flaky", None)
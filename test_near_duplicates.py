@@ -0,0 +1,65 @@
+import io
+import random
+
+import numpy as np
+from PIL import Image
+
+import near_duplicates
+from near_duplicates import NearDuplicateIndex, dhash, hamming
+
+def _jpeg(array):
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+def test_dhash_tolerates_noise_but_not_new_scenes():
+    rng = np.random.default_rng(0)
+    scene = np.kron(rng.integers(0, 255, (12, 16, 3)), np.ones((40, 40, 1))).astype(np.uint8)
+    noisy = np.clip(scene + rng.normal(0, 4, scene.shape), 0, 255).astype(np.uint8)
+    other = np.kron(rng.integers(0, 255, (12, 16, 3)), np.ones((40, 40, 1))).astype(np.uint8)
+    assert hamming(dhash(_jpeg(scene)), dhash(_jpeg(noisy))) <= 4
+    assert hamming(dhash(_jpeg(scene)), dhash(_jpeg(other))) > 10
+
+def test_find_matches_brute_force():
+    rng = random.Random(1)
+    index = NearDuplicateIndex(radius=6, max_entries=10_000)
+    stored = [rng.getrandbits(64) for _ in range(500)]
+    for i, h in enumerate(stored):
+        index.add(h, i)
+    for _ in range(300):
+        base = rng.choice(stored)
+        query = base
+        for bit in rng.sample(range(64), rng.randint(0, 9)):
+            query ^= 1 << bit
+        best = min(hamming(h, query) for h in stored)
+        match = index.find(query)
+        if best <= 6:
+            assert match is not None and match[1] == best
+        else:
+            assert match is None
+
+def test_eviction_by_size_and_age(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(near_duplicates.time, "monotonic", lambda: now[0])
+    index = NearDuplicateIndex(radius=2, max_entries=2, ttl=10)
+    index.add(1, "a")
+    index.add(2, "b")
+    index.add(4, "c")
+    assert index.stats()["size"] == 2
+    assert index.find(0xF << 40) is None
+    assert index.find(4) == ("c", 0)
+    now[0] = 11
+    assert index.find(4) is None
+    stats = index.stats()
+    assert stats["size"] == 0 and stats["lookups"] == 3 and stats["skip_rate"] == 1 / 3
+
+def test_repeated_lookups_by_one_owner_count_once():
+    index = NearDuplicateIndex(radius=2)
+    assert index.find(0b1000, owner="a") is None
+    index.add(0b1000, "first", owner="a")
+    # A rerun of report a finds its own image, but that is not a skip
+    assert index.find(0b1000, owner="a") == ("first", 0)
+    assert index.find(0b1001, owner="b") == ("first", 1)
+    assert index.find(0b1001, owner="b") == ("first", 1)
+    stats = index.stats()
+    assert stats["lookups"] == 2 and stats["skips"] == 1
@@ -0,0 +1,66 @@
+from report_archive import compact, load_reports, load_rollup
+from report_store import ReportStore
+
+def _report(hour, level, ward, weapons=()):
+    return {
+        "timestamp": f"2026-10-{hour // 24 + 1:02d}T{hour % 24:02d}:15:00",
+        "threat_level": level,
+        "weapons_detected": [{"weapon": w, "confidence": 0.9} for w in weapons],
+        "location": {"manual": {"county": "Nairobi", "ward": ward}},
+    }
+
+def test_incremental_compaction_and_rollups(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.db"))
+    archive = str(tmp_path / "archive")
+    store.write([_report(1, "LOW", "Kilimani"), _report(1, "SERIOUS", "Kilimani", ["knife", "knife"])])
+    assert compact(store, archive) == 2
+    store.write([_report(1, "LOW", "Kilimani"), _report(30, "SERIOUS-URGENT", "Parklands", ["gun"])])
+    assert compact(store, archive) == 2
+    assert compact(store, archive) == 0
+
+    reports = load_rollup("reports", archive_dir=archive)
+    counts = {(r.threat_level, r.ward, r.hour.day): r.reports for r in reports.itertuples()}
+    assert counts == {("LOW", "Kilimani", 1): 2, ("SERIOUS", "Kilimani", 1): 1, ("SERIOUS-URGENT", "Parklands", 2): 1}
+    weapons = load_rollup("weapons", archive_dir=archive, ward="Kilimani")
+    assert weapons[["weapon", "detections", "reports"]].values.tolist() == [["knife", 2, 1]]
+
+    urgent = load_reports(since="2026-10-02", threat_levels=["SERIOUS-URGENT"], archive_dir=archive)
+    assert urgent["ward"].tolist() == ["Parklands"] and urgent["weapons"].iloc[0].tolist() == ["gun"]
+    assert len(load_reports(archive_dir=archive)) == 4
+    # Location filters apply before the limit
+    kilimani = load_reports(archive_dir=archive, limit=1, ward="Kilimani", columns=["timestamp", "ward"])
+    assert kilimani["ward"].tolist() == ["Kilimani"]
+    store.close()
+
+def test_updated_reports_move_between_partitions_and_rollups(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.db"))
+    archive = str(tmp_path / "archive")
+    report = {**_report(1, "LOW", "Kilimani"), "report_id": "abc123"}
+    store.write([report, _report(2, "LOW", "Kilimani")])
+    assert compact(store, archive) == 2
+    # Resubmitted with a weapon and a higher level: the row keeps its id but gets a new revision
+    store.write([{**report, "threat_level": "SERIOUS", "weapons_detected": [{"weapon": "knife", "confidence": 0.8}]}])
+    assert compact(store, archive) == 1
+
+    reports = load_rollup("reports", archive_dir=archive)
+    counts = {(r.threat_level, r.hour.hour): r.reports for r in reports.itertuples()}
+    assert counts == {("SERIOUS", 1): 1, ("LOW", 2): 1}
+    assert load_rollup("weapons", archive_dir=archive)[["weapon", "reports"]].values.tolist() == [["knife", 1]]
+    archived = load_reports(archive_dir=archive)
+    assert sorted(archived["threat_level"].tolist()) == ["LOW", "SERIOUS"]
+    assert load_reports(threat_levels=["LOW"], archive_dir=archive)["timestamp"].dt.hour.tolist() == [2]
+    store.close()
+
+def test_small_files_are_merged(tmp_path, monkeypatch):
+    import glob
+    import report_archive
+    monkeypatch.setattr(report_archive, "MAX_FILES_PER_PARTITION", 1)
+    store = ReportStore(str(tmp_path / "reports.db"))
+    archive = str(tmp_path / "archive")
+    for hour in (1, 2):
+        store.write([_report(hour, "LOW", "Kilimani")])
+        compact(store, archive)
+    files = glob.glob(str(tmp_path / "archive" / "reports" / "**" / "*.parquet"), recursive=True)
+    assert [f.rsplit("/", 1)[1] for f in files] == ["part-000000000001-000000000002-0.parquet"]
+    assert len(load_reports(archive_dir=archive)) == 2
+    store.close()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite report store
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from report_store import ReportStore
+
+def make_report(threat_level, minutes_ago, ward=""):
+    return {
+        "timestamp": (datetime.now() - timedelta(minutes=minutes_ago)).isoformat(),
+        "weapons_detected": [],
+        "threat_level": threat_level,
+        "location": {"auto": None, "manual": {"county": "Nairobi", "ward": ward}}
+    }
+
+def test_background_writes_and_indexed_query(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.db"))
+    for report in [
+        make_report("SERIOUS-URGENT", 5, "Kilimani"),
+        make_report("SERIOUS-URGENT", 90, "Kilimani"),
+        make_report("SERIOUS-URGENT", 10, "Westlands"),
+        make_report("LOW", 1, "Kilimani"),
+    ]:
+        store.submit(report)
+    store.flush()
+
+    recent = store.query(threat_level="SERIOUS-URGENT", since=timedelta(hours=1), ward="Kilimani")
+    assert len(recent) == 1 and recent[0]["location"]["manual"]["ward"] == "Kilimani"
+    assert store.count(county="Nairobi") == 4
+    plan = store._reader().execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM reports WHERE threat_level = ? AND timestamp >= ?", ("LOW", "")
+    ).fetchall()
+    assert "idx_reports_threat_timestamp" in str(plan)
+    store.close()
+
+def test_import_legacy_json_is_idempotent(tmp_path):
+    legacy = tmp_path / "reports"
+    legacy.mkdir()
+    (legacy / "20250713_113425.json").write_text(json.dumps({"weapons_detected": [], "threat_level": "LOW"}))
+    (legacy / "old.json").write_text(json.dumps({"weapons_detected": [], "alert_level": "SERIOUS"}))
+
+    store = ReportStore(str(tmp_path / "reports.db"))
+    assert store.import_json_files([str(legacy)]) == 2
+    assert store.import_json_files([str(legacy)]) == 0
+    assert store.query(threat_level="LOW")[0]["timestamp"] == "2025-07-13T11:34:25"
+    assert store.count(threat_level="SERIOUS") == 1
+    store.close()
+
+def test_resubmitted_report_id_updates_in_place(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.db"))
+    report = make_report("LOW", 1, "Kilimani")
+    report["report_id"] = "abc123"
+    store.submit(report)
+    # A rerun submits the same report again, here with an edited threat level
+    store.submit({**report, "threat_level": "SERIOUS"})
+    store.submit(make_report("LOW", 2))
+    store.flush()
+    assert store.count() == 2
+    assert store.query(threat_level="SERIOUS")[0]["report_id"] == "abc123"
+    store.close()
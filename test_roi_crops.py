@@ -0,0 +1,28 @@
+import numpy as np
+import torch
+
+from image_decode import DecodedImage
+from object_detector import LabelTable, _person_crops
+
+def test_person_crops_are_views_in_decoded_pixels():
+    table = LabelTable({0: "N/A", 1: "person", 44: "bottle"})
+    # Decoded at half size: original boxes are divided by 2, then widened by the margin
+    image = DecodedImage(np.zeros((300, 400, 3), dtype=np.uint8), (800, 600))
+    results = {
+        "scores": torch.tensor([0.95, 0.9, 0.3, 0.99]),
+        "labels": torch.tensor([1, 44, 1, 1]),
+        "boxes": torch.tensor([[200.0, 100, 400, 500], [0, 0, 100, 100], [0, 0, 400, 400], [780, 580, 800, 600]]),
+    }
+    crops = _person_crops(image, results, table)
+    # The low-score person, the bottle and the person too small to search are skipped
+    assert len(crops) == 1
+    pixels, target, offset, scale = crops[0]
+    assert np.shares_memory(pixels, image.array)
+    assert offset == (85, 20) and target == pixels.shape[:2] == (261, 131)
+    assert scale == (2.0, 2.0)
+
+def test_threat_labels_follow_label_names():
+    from benchmarks import tiny_models
+    table = LabelTable(dict(enumerate(tiny_models.COCO_LABELS)))
+    threats = {table.names[i] for i in torch.nonzero(table.threat).flatten().tolist()}
+    assert threats == {"knife", "scissors", "baseball bat", "tennis racket"}
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched threat analysis and when it can skip the classifiers
+"""
+
+import model_registry
+from benchmarks import tiny_models
+from sentiment_analyzer import _classify, analyze_threat_level_batch
+
+class StubPipeline:
+    """Text-classification stand-in that gives every text the same result and records its calls"""
+
+    def __init__(self, label, score):
+        self.label = label
+        self.score = score
+        self.calls = []
+
+    def __call__(self, texts, **kwargs):
+        self.calls.append((list(texts), kwargs))
+        return [{"label": self.label, "score": self.score} for _ in texts]
+
+def _install(monkeypatch, violence, sentiment):
+    monkeypatch.setitem(model_registry._MODELS, "violence", violence)
+    monkeypatch.setitem(model_registry._MODELS, "sentiment", sentiment)
+
+def test_classifiers_are_skipped_when_rules_decide(monkeypatch):
+    violence, sentiment = StubPipeline("toxic", 0.99), StubPipeline("NEGATIVE", 0.99)
+    _install(monkeypatch, violence, sentiment)
+    levels = analyze_threat_level_batch([
+        ([{"weapon": "handgun", "severity": "SERIOUS-URGENT"}], ""),
+        ([], "a gun, a knife and an attack"),  # three keywords are urgent already
+        ([], ""),
+    ])
+    assert levels == ["SERIOUS-URGENT", "SERIOUS-URGENT", "LOW"]
+    assert violence.calls == [] and sentiment.calls == []
+
+def test_classifiers_run_where_they_can_change_the_level(monkeypatch):
+    violence, sentiment = StubPipeline("toxic", 0.95), StubPipeline("NEGATIVE", 0.9)
+    _install(monkeypatch, violence, sentiment)
+    levels = analyze_threat_level_batch([
+        ([], "a man with a knife"),  # one keyword: toxic pushes it to SERIOUS
+        ([{"weapon": "scissors", "severity": "SERIOUS"}], "they were attacking and shooting"),
+        ([], "a car parked near the shop"),  # no keyword: +1 cannot reach a rule, only sentiment runs
+    ], batch_size=4)
+    assert levels == ["SERIOUS", "SERIOUS-URGENT", "MEDIUM"]
+    # One batched call per classifier, only for the undecided texts
+    assert [len(texts) for texts, _ in violence.calls] == [2]
+    assert [len(texts) for texts, _ in sentiment.calls] == [1]
+    assert violence.calls[0][1] == {"batch_size": 4, "truncation": True}
+
+def test_non_toxic_text_falls_through_to_sentiment(monkeypatch):
+    violence, sentiment = StubPipeline("non-toxic", 0.99), StubPipeline("POSITIVE", 0.99)
+    _install(monkeypatch, violence, sentiment)
+    assert analyze_threat_level_batch([([], "a man with a knife")]) == ["LOW"]
+    assert len(sentiment.calls) == 1
+
+def test_long_texts_are_truncated():
+    pipe = tiny_models.tiny_text_classifier(["toxic", "non-toxic"])
+    long_text = "a person holding a gun near the shop " * 200  # well past 512 tokens
+    results = _classify(pipe, [long_text, "a knife"], batch_size=2)
+    assert all(result is not None and result["label"] in ("toxic", "non-toxic") for result in results)
@@ -0,0 +1,40 @@
+import torch
+
+import tiling
+from tiling import decode_edges, merge_detections, tile_windows
+
+def test_tiling_is_opt_in(monkeypatch):
+    monkeypatch.setattr(tiling, "TILE_MODE", "off")
+    assert tile_windows(4000, 3000, 512) == []
+    assert decode_edges(512, 1333, (4000, 3000)) == (512, 1333)
+
+def test_small_images_are_not_tiled(monkeypatch):
+    monkeypatch.setattr(tiling, "TILE_MODE", "auto")
+    assert tile_windows(800, 600, 512) == []
+    assert tile_windows(1333, 1000, 512) == []
+
+def test_only_tileable_images_decode_larger(monkeypatch):
+    monkeypatch.setattr(tiling, "TILE_MODE", "auto")
+    assert decode_edges(512, 1333, (1333, 1000)) == (512, 1333)
+    assert decode_edges(512, 1333, (4000, 3000)) == (1024, 2666)
+
+def test_tiles_cover_the_image_with_overlap(monkeypatch):
+    monkeypatch.setattr(tiling, "TILE_MODE", "auto")
+    width, height = 2048, 1536
+    tiles = tile_windows(width, height, 512, max_grid=3, overlap=0.2)
+    covered = torch.zeros(height, width, dtype=torch.bool)
+    for x0, y0, x1, y1 in tiles:
+        assert x1 - x0 == y1 - y0 and 0 <= x0 < x1 <= width and 0 <= y0 < y1 <= height
+        covered[y0:y1, x0:x1] = True
+    assert covered.all()
+    assert len(tiles) == 15
+
+def test_merge_is_class_aware():
+    tile = {"boxes": torch.tensor([[10.0, 10, 50, 50], [10, 10, 50, 50]]),
+            "scores": torch.tensor([0.9, 0.6]), "labels": torch.tensor([1, 2])}
+    full = {"boxes": torch.tensor([[12.0, 11, 51, 50], [200, 200, 240, 240]]),
+            "scores": torch.tensor([0.5, 0.7]), "labels": torch.tensor([1, 1])}
+    merged = merge_detections([tile, full])
+    kept = sorted(zip(merged["labels"].tolist(), merged["scores"].tolist()))
+    assert [label for label, _ in kept] == [1, 1, 2]
+    assert [round(score, 2) for _, score in kept] == [0.7, 0.9, 0.6]
@@ -0,0 +1,26 @@
+from video_stream import IoUTracker, iou
+
+def _gun(x, confidence=0.8):
+    return {"weapon": "gun", "severity": "SERIOUS-URGENT", "confidence": confidence, "bbox": [x, 10, x + 50, 60]}
+
+def test_iou():
+    assert iou([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
+    assert iou([0, 0, 10, 10], [20, 20, 30, 30]) == 0.0
+    assert abs(iou([0, 0, 10, 10], [5, 0, 15, 10]) - 1 / 3) < 1e-9
+
+def test_one_alert_per_track():
+    tracker = IoUTracker(max_gap=10, min_hits=2)
+    events = []
+    for frame in range(0, 200, 5):
+        events += tracker.update(frame, [_gun(100 + frame // 5)])
+    events += tracker.finish()
+    assert [e["event"] for e in events] == ["alert", "ended"]
+    assert events[1]["first_frame"] == 0 and events[1]["last_frame"] == 195 and events[1]["hits"] == 40
+
+def test_track_ends_after_gap_and_low_severity_ignored():
+    tracker = IoUTracker(max_gap=10, min_hits=2)
+    person = {"weapon": "person", "severity": "LOW", "confidence": 0.9, "bbox": [0, 0, 10, 10]}
+    assert tracker.update(0, [_gun(0), person]) == []
+    assert [e["event"] for e in tracker.update(5, [_gun(2)])] == ["alert"]
+    assert [e["event"] for e in tracker.update(30, [_gun(400)])] == ["ended"]
+    assert len(tracker.tracks) == 1
@@ -0,0 +1,78 @@
+# ==========================================
+# 📄 detectors/tiling.py
+# ==========================================
+"""
+Tiled inference for high-resolution frames. A wide CCTV shot is cut into
+overlapping square tiles at roughly the model's input size, so small objects
+keep enough pixels to be detected; tiles and the full frame go through the
+model in one batch and their boxes are merged with class-aware NMS.
+
+Tiling is opt-in (TILE_MODE=auto) and costs a forward pass per tile: a
+1920x1080 frame with the defaults becomes 8 tiles plus the full frame. It is
+also adaptive: an image whose shortest edge is below TILE_MIN_SCALE times the
+model's input edge is decoded and processed as a single full frame, exactly
+as without tiling. Only tileable images are decoded above the model size.
+"""
+import math
+import os
+
+import torch
+
+TILE_MODE = os.environ.get("TILE_MODE", "off")  # auto | off
+TILE_OVERLAP = float(os.environ.get("TILE_OVERLAP", "0.2"))
+# Most tiles along the shortest edge; bounds the batch to a few times this squared
+TILE_MAX_GRID = int(os.environ.get("TILE_MAX_GRID", "2"))
+TILE_MIN_SCALE = float(os.environ.get("TILE_MIN_SCALE", "2.0"))
+TILE_NMS_IOU = float(os.environ.get("TILE_NMS_IOU", "0.5"))
+
+def tiling_enabled():
+    return TILE_MODE != "off"
+
+def tileable(width, height, edge, max_grid=None, min_scale=None):
+    """Whether a width x height image is large enough to be cut into tiles of about edge pixels"""
+    max_grid = TILE_MAX_GRID if max_grid is None else max_grid
+    min_scale = TILE_MIN_SCALE if min_scale is None else min_scale
+    return tiling_enabled() and bool(edge) and max_grid >= 2 and min(width, height) >= min_scale * edge
+
+def decode_edges(shortest_edge, longest_edge, size):
+    """Decode size for an image of the given original size
+
+    Tileable images keep enough resolution for the largest tile grid; every
+    other image decodes at the model size.
+    """
+    if not shortest_edge or not tileable(*size, shortest_edge):
+        return shortest_edge, longest_edge
+    factor = max(TILE_MAX_GRID, TILE_MIN_SCALE)
+    return shortest_edge * factor, longest_edge and longest_edge * factor
+
+def tile_windows(width, height, edge, max_grid=None, min_scale=None, overlap=None):
+    """Square (x0, y0, x1, y1) tiles over a width x height image, or [] when one pass is enough"""
+    max_grid = TILE_MAX_GRID if max_grid is None else max_grid
+    min_scale = TILE_MIN_SCALE if min_scale is None else min_scale
+    overlap = TILE_OVERLAP if overlap is None else overlap
+    short = min(width, height)
+    if not tileable(width, height, edge, max_grid, min_scale):
+        return []
+    grid = min(max_grid, int(short // edge))
+    tile = min(short, math.ceil(short / (grid - (grid - 1) * overlap)))
+
+    def starts(length):
+        count = max(1, math.ceil((length - tile) / (tile * (1 - overlap))) + 1)
+        if count == 1:
+            return [0]
+        step = (length - tile) / (count - 1)
+        return [round(i * step) for i in range(count)]
+
+    return [(x, y, x + tile, y + tile) for y in starts(height) for x in starts(width)]
+
+def merge_detections(results, iou_threshold=None):
+    """Concatenate post-processed results (already in one coordinate frame) and apply class-aware NMS"""
+    from torchvision.ops import batched_nms
+
+    if len(results) == 1:
+        return results[0]
+    boxes = torch.cat([r["boxes"].float() for r in results])
+    scores = torch.cat([r["scores"].float() for r in results])
+    labels = torch.cat([r["labels"] for r in results])
+    keep = batched_nms(boxes.float(), scores.float(), labels, TILE_NMS_IOU if iou_threshold is None else iou_threshold)
+    return {"scores": scores[keep], "labels": labels[keep], "boxes": boxes[keep]}
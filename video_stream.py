@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# ==========================================
+# 📄 detectors/video_stream.py
+# ==========================================
+"""
+Streaming mode for video files and frame directories. Frames are decoded
+lazily and sampled at a stride, detected in batches, and linked across frames
+by a lightweight IoU tracker, so a weapon visible for many consecutive frames
+raises one alert instead of one report per frame. Only the current batch of
+frames and the active tracks are held in memory.
+
+Usage:
+    python video_stream.py footage.mp4 --stride 5
+    python video_stream.py /frames/cam01 --stride 2 --store
+"""
+import argparse
+import itertools
+import json
+import os
+
+try:
+    import cv2  # optional, only needed to decode video files
+except ImportError:
+    cv2 = None
+
+from bulk_scan import IMAGE_EXTENSIONS
+
+SEVERITY_RANK = {"LOW": 0, "MEDIUM": 1, "SERIOUS": 2, "SERIOUS-URGENT": 3}
+
+def iter_frames(source, stride=1):
+    """Yield (frame_index, RGB array or image path) for every stride-th frame of a video or directory"""
+    if os.path.isdir(source):
+        names = sorted(n for n in os.listdir(source) if n.lower().endswith(IMAGE_EXTENSIONS))
+        for index in range(0, len(names), stride):
+            yield index, os.path.join(source, names[index])
+        return
+    if cv2 is None:
+        raise RuntimeError("opencv-python is required to read video files; pass a frame directory instead")
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise RuntimeError(f"Could not open video {source}")
+    try:
+        for index in itertools.count():
+            # grab() skips a frame without decoding it; only sampled frames are retrieved
+            if not capture.grab():
+                break
+            if index % stride:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            yield index, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    finally:
+        capture.release()
+
+def iou(a, b):
+    """Intersection over union of two [x0, y0, x1, y1] boxes"""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+class Track:
+    def __init__(self, track_id, detection, frame_index):
+        self.track_id = track_id
+        self.weapon = detection["weapon"]
+        self.severity = detection["severity"]
+        self.bbox = detection["bbox"]
+        self.confidence = detection["confidence"]
+        self.first_frame = self.last_frame = frame_index
+        self.hits = 1
+        self.alerted = False
+
+    def update(self, detection, frame_index):
+        self.bbox = detection["bbox"]
+        self.confidence = max(self.confidence, detection["confidence"])
+        self.last_frame = frame_index
+        self.hits += 1
+
+    def event(self, kind):
+        return {
+            "event": kind, "track_id": self.track_id, "weapon": self.weapon, "severity": self.severity,
+            "first_frame": self.first_frame, "last_frame": self.last_frame, "hits": self.hits,
+            "confidence": self.confidence, "bbox": self.bbox
+        }
+
+class IoUTracker:
+    """Greedy per-label IoU matching of detections to tracks
+
+    A track raises one "alert" event once it has been seen min_hits times and
+    one "ended" event after max_gap frames without a match.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_gap=30, min_hits=2, min_severity="MEDIUM"):
+        self.iou_threshold = iou_threshold
+        self.max_gap = max_gap
+        self.min_hits = min_hits
+        self.min_rank = SEVERITY_RANK[min_severity]
+        self.tracks = {}
+        self._next_id = 1
+
+    def update(self, frame_index, detections):
+        """Feed one frame's detections; returns the events it produced"""
+        events = []
+        candidates = [
+            d for d in detections
+            if len(d.get("bbox") or []) == 4 and SEVERITY_RANK.get(d.get("severity"), 0) >= self.min_rank
+        ]
+        pairs = sorted(
+            ((iou(track.bbox, d["bbox"]), track_id, i)
+             for track_id, track in self.tracks.items()
+             for i, d in enumerate(candidates) if d["weapon"] == track.weapon),
+            reverse=True
+        )
+        matched_tracks, matched_detections = set(), set()
+        for overlap, track_id, i in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if track_id in matched_tracks or i in matched_detections:
+                continue
+            matched_tracks.add(track_id)
+            matched_detections.add(i)
+            self.tracks[track_id].update(candidates[i], frame_index)
+        for i, detection in enumerate(candidates):
+            if i not in matched_detections:
+                track = Track(self._next_id, detection, frame_index)
+                self.tracks[track.track_id] = track
+                self._next_id += 1
+        for track in list(self.tracks.values()):
+            if not track.alerted and track.hits >= self.min_hits:
+                track.alerted = True
+                events.append(track.event("alert"))
+            elif frame_index - track.last_frame > self.max_gap:
+                del self.tracks[track.track_id]
+                if track.alerted:
+                    events.append(track.event("ended"))
+        return events
+
+    def finish(self):
+        """Close every remaining track at the end of the stream"""
+        events = [track.event("ended") for track in self.tracks.values() if track.alerted]
+        self.tracks.clear()
+        return events
+
+def process_stream(source, stride=5, batch_size=8, tracker=None):
+    """Yield tracker events for a video file or frame directory"""
+    from object_detector import detect_weapons_batch
+    tracker = tracker or IoUTracker(max_gap=6 * stride)
+    frames = iter_frames(source, stride)
+    while True:
+        batch = list(itertools.islice(frames, batch_size))
+        if not batch:
+            break
+        detections = detect_weapons_batch([frame for _, frame in batch], batch_size=len(batch))
+        for (frame_index, _), detected in zip(batch, detections):
+            yield from tracker.update(frame_index, detected)
+    yield from tracker.finish()
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect weapons in a video file or frame directory")
+    parser.add_argument("source")
+    parser.add_argument("--stride", type=int, default=5, help="analyze every Nth frame")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--min-hits", type=int, default=2, help="sampled frames before a track alerts")
+    parser.add_argument("--min-severity", default="MEDIUM", choices=list(SEVERITY_RANK))
+    parser.add_argument("--store", action="store_true", help="write one report per alert to the report store")
+    args = parser.parse_args()
+
+    store = None
+    if args.store:
+        from report_store import ReportStore
+        from incident_report import build_report
+        store = ReportStore()
+    tracker = IoUTracker(max_gap=6 * args.stride, min_hits=args.min_hits, min_severity=args.min_severity)
+    for event in process_stream(args.source, args.stride, args.batch_size, tracker):
+        print(json.dumps(event))
+        if store and event["event"] == "alert":
+            weapon = {key: event[key] for key in ("weapon", "severity", "confidence", "bbox")}
+            store.submit(build_report([weapon], event["severity"], "", source=args.source, track=event))
+    if store:
+        store.close()
+
+if __name__ == "__main__":
+    main()